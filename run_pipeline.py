@@ -7,8 +7,10 @@ Garantiza ejecución atómica por etapas, validación estricta de esquemas y aud
 import sys
 import time
 import logging
+from importlib import import_module
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import pandas as pd
 
 from scripts.config import (
@@ -17,16 +19,15 @@ from scripts.config import (
     get_run_audit_path,
     get_run_log_path,
     NORMALIZED_STATEMENT_SCHEMA,
+    NORMALIZED_STATEMENT_DTYPES,
     FINAL_APPFOLIO_COLUMNS,
-    AMEX_NORMALIZED,
-    CITI_NORMALIZED,
-    AMEX_NETTED,
-    CITI_NETTED,
-    AMEX_BULK_BILL,
-    CITI_BULK_BILL,
+    SOURCE_NORMALIZE_WORKERS,
+    STATEMENT_SOURCES,
+    StatementSource,
     UNMATCHED_LEDGER_REPORT
 )
 from scripts.rules_manager import RulesManager
+from scripts.utils.artifact_io import read_artifact, resolve_artifact_path
 
 
 # ==============================================================================
@@ -90,6 +91,16 @@ def validate_schema(
             )
 
 
+# ==============================================================================
+# EJECUCIÓN DE NORMALIZADORES REGISTRADOS
+# ==============================================================================
+def run_source_normalizer(source: StatementSource, rules: RulesManager) -> Tuple[Dict[str, int], float]:
+    """Importa y ejecuta el normalizador de una fuente; devuelve (métricas raw_rows/date_coerced, segundos)."""
+    t0 = time.time()
+    metrics = import_module(source.normalizer).run(rules)
+    return metrics, time.time() - t0
+
+
 # ==============================================================================
 # ORQUESTADOR PRINCIPAL
 # ==============================================================================
@@ -110,9 +121,14 @@ class PipelineOrchestrator:
         errors: int,
         status: str,
         duration: float,
-        error_msg: str = ""
+        error_msg: str = "",
+        cache_stats: Optional[Dict[str, int]] = None
     ) -> None:
-        """Registra la métrica atómica de una etapa en el dataset de auditoría."""
+        """
+        Registra la métrica atómica de una etapa en el dataset de auditoría.
+        cache_stats: contadores acumulados de la caché de resolución de RulesManager al cierre de la etapa.
+        """
+        cache_stats = cache_stats or {}
         self.audit_records.append({
             "run_id": self.run_id,
             "stage": stage,
@@ -123,6 +139,9 @@ class PipelineOrchestrator:
             "errors": errors,
             "status": status,
             "duration_sec": round(duration, 3),
+            "cache_hits": cache_stats.get("hits", 0),
+            "cache_misses": cache_stats.get("misses", 0),
+            "cache_evictions": cache_stats.get("evictions", 0),
             "error_message": error_msg
         })
 
@@ -139,73 +158,70 @@ class PipelineOrchestrator:
             self.logger.info("Etapa 1: Cargando RulesManager y compilando índices O(1)...")
             rules = RulesManager()
             
-            # Métrica real de reglas activas en memoria
+            # Métrica real de reglas activas en memoria (patrones de los autómatas + alertas)
             compiled_rules_count = (
-                len(rules.manual_vendor_matchers)
-                + len(rules.vendor_regex_rules)
-                + len(rules.property_regex_rules)
+                len(rules.vendor_matcher)
+                + len(rules.property_matcher)
                 + len(rules.alerts_rules)
             )
 
+            if rules.invalid_gl_hints:
+                self.logger.warning(
+                    f"⚠️ {len(rules.invalid_gl_hints)} GL_Account_Hint sin cuenta en el plan: "
+                    f"{sorted(set(rules.invalid_gl_hints))}"
+                )
+
             self.record_stage(
                 stage="load_rules",
                 artifact="mapping_rules.xlsx",
                 in_rows=0,
                 out_rows=compiled_rules_count,
-                warnings=0,
-                errors=0,
-                status="SUCCESS",
-                duration=time.time() - t0
-            )
-            # ------------------------------------------------------------------
-            # ETAPA 2A: Normalización Amex
-            # ------------------------------------------------------------------
-            t0 = time.time()
-            self.logger.info("Etapa 2A: Normalizando extractos AMEX...")
-            from scripts.ingestion import normalize_amex
-            amex_raw_count = normalize_amex.run(rules)
-            
-            if not AMEX_NORMALIZED.exists():
-                raise FileNotFoundError(f"Artefacto esperado no generado: {AMEX_NORMALIZED}")
-            
-            df_amex_norm = pd.read_csv(AMEX_NORMALIZED)
-            validate_schema(df_amex_norm, NORMALIZED_STATEMENT_SCHEMA, "normalize_amex", strict=False)
-            
-            self.record_stage(
-                stage="normalize_amex",
-                artifact=AMEX_NORMALIZED.name,
-                in_rows=amex_raw_count,
-                out_rows=len(df_amex_norm),
-                warnings=0,
+                warnings=len(rules.invalid_gl_hints),
                 errors=0,
                 status="SUCCESS",
-                duration=time.time() - t0
+                duration=time.time() - t0,
+                cache_stats=rules.cache_stats()
             )
-
             # ------------------------------------------------------------------
-            # ETAPA 2B: Normalización Citi (Simétrica, recibe RulesManager)
+            # ETAPA 2: Normalización concurrente de las fuentes registradas
             # ------------------------------------------------------------------
             t0 = time.time()
-            self.logger.info("Etapa 2B: Normalizando extracto CITI Mastercard...")
-            from scripts.ingestion import normalize_citi
-            citi_raw_count = normalize_citi.run(rules)
-            
-            if not CITI_NORMALIZED.exists():
-                raise FileNotFoundError(f"Artefacto esperado no generado: {CITI_NORMALIZED}")
-            
-            df_citi_norm = pd.read_csv(CITI_NORMALIZED)
-            validate_schema(df_citi_norm, NORMALIZED_STATEMENT_SCHEMA, "normalize_citi", strict=False)
-            
-            self.record_stage(
-                stage="normalize_citi",
-                artifact=CITI_NORMALIZED.name,
-                in_rows=citi_raw_count,
-                out_rows=len(df_citi_norm),
-                warnings=0,
-                errors=0,
-                status="SUCCESS",
-                duration=time.time() - t0
-            )
+            self.logger.info(f"Etapa 2: Normalizando extractos {', '.join(s.upper() for s in STATEMENT_SOURCES)} en paralelo...")
+            workers = SOURCE_NORMALIZE_WORKERS or len(STATEMENT_SOURCES)
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                futures = {
+                    name: pool.submit(run_source_normalizer, source, rules)
+                    for name, source in STATEMENT_SOURCES.items()
+                }
+                normalize_results = {name: future.result() for name, future in futures.items()}
+
+            normalized_frames: Dict[str, pd.DataFrame] = {}
+            for name, source in STATEMENT_SOURCES.items():
+                metrics, duration = normalize_results[name]
+                norm_path = resolve_artifact_path(source.normalized_path)
+                if not norm_path.exists():
+                    raise FileNotFoundError(f"Artefacto esperado no generado: {norm_path}")
+
+                df_norm = read_artifact(source.normalized_path, NORMALIZED_STATEMENT_DTYPES)
+                validate_schema(df_norm, NORMALIZED_STATEMENT_SCHEMA, f"normalize_{name}", strict=False)
+                normalized_frames[name] = df_norm
+
+                date_coerced = metrics.get("date_coerced", 0)
+                if date_coerced:
+                    self.logger.warning(f"⚠️ {name.upper()}: {date_coerced} fechas no interpretables coercionadas a NaT.")
+
+                self.record_stage(
+                    stage=f"normalize_{name}",
+                    artifact=norm_path.name,
+                    in_rows=metrics.get("raw_rows", 0),
+                    out_rows=len(df_norm),
+                    warnings=date_coerced,
+                    errors=0,
+                    status="SUCCESS",
+                    duration=duration,
+                    cache_stats=rules.cache_stats()
+                )
+            self.logger.info(f"Etapa 2 completada en {time.time() - t0:.2f}s (acotada por la fuente más lenta)")
 
             # ------------------------------------------------------------------
             # ETAPA 3: Deduplicación vs Ledger de AppFolio
@@ -216,32 +232,33 @@ class PipelineOrchestrator:
             dedup_results = dedup_appfolio.run(rules)
             
             # Verificación de artefactos
-            if not AMEX_NETTED.exists() or not CITI_NETTED.exists():
+            net_paths = {name: resolve_artifact_path(source.netted_path) for name, source in STATEMENT_SOURCES.items()}
+            if not all(path.exists() for path in net_paths.values()):
                 raise FileNotFoundError("Artefactos neteados no encontrados tras la deduplicación.")
             
-            df_amex_net = pd.read_csv(AMEX_NETTED)
-            df_citi_net = pd.read_csv(CITI_NETTED)
-
-            self.record_stage(
-                stage="dedup_amex",
-                artifact=AMEX_NETTED.name,
-                in_rows=len(df_amex_norm),
-                out_rows=len(df_amex_net),
-                warnings=dedup_results.get("amex_duplicates", 0),
-                errors=0,
-                status="SUCCESS",
-                duration=time.time() - t0
-            )
-            self.record_stage(
-                stage="dedup_citi",
-                artifact=CITI_NETTED.name,
-                in_rows=len(df_citi_norm),
-                out_rows=len(df_citi_net),
-                warnings=dedup_results.get("citi_duplicates", 0),
-                errors=0,
-                status="SUCCESS",
-                duration=time.time() - t0
-            )
+            netted_frames = {
+                name: read_artifact(source.netted_path, NORMALIZED_STATEMENT_DTYPES)
+                for name, source in STATEMENT_SOURCES.items()
+            }
+
+            for name in STATEMENT_SOURCES:
+                if dedup_results.get(f"{name}_split_matches"):
+                    self.logger.info(
+                        f"{name.upper()}: {dedup_results[f'{name}_split_matches']} facturas conciliadas con pagos fraccionados "
+                        f"({dedup_results[f'{name}_split_charges']} cargos, {dedup_results[f'{name}_split_search_nodes']} nodos, "
+                        f"{dedup_results[f'{name}_split_budget_exhausted']} búsquedas agotadas)"
+                    )
+                self.record_stage(
+                    stage=f"dedup_{name}",
+                    artifact=net_paths[name].name,
+                    in_rows=len(normalized_frames[name]),
+                    out_rows=len(netted_frames[name]),
+                    warnings=dedup_results.get(f"{name}_duplicates", 0),
+                    errors=0,
+                    status="SUCCESS",
+                    duration=time.time() - t0,
+                    cache_stats=rules.cache_stats()
+                )
 
             # ------------------------------------------------------------------
             # ETAPA 4: Resolución de Entidades, Prorrateo y Bulk Bills
@@ -251,33 +268,33 @@ class PipelineOrchestrator:
             from scripts.output import bulk_bill_generator
             gen_metrics = bulk_bill_generator.run_generation(rules, self.run_id)
 
-            if not AMEX_BULK_BILL.exists() or not CITI_BULK_BILL.exists():
+            if not all(source.bulk_bill_path.exists() for source in STATEMENT_SOURCES.values()):
                 raise FileNotFoundError("Archivos finales Bulk Bill no generados.")
 
-            df_amex_final = pd.read_csv(AMEX_BULK_BILL)
-            df_citi_final = pd.read_csv(CITI_BULK_BILL)
+            final_frames = {name: pd.read_csv(source.bulk_bill_path) for name, source in STATEMENT_SOURCES.items()}
 
             # Gateway Estricto: Validación de columnas y orden exacto de AppFolio
-            validate_schema(df_amex_final, FINAL_APPFOLIO_COLUMNS, "bulk_bill_amex", strict=True)
-            validate_schema(df_citi_final, FINAL_APPFOLIO_COLUMNS, "bulk_bill_citi", strict=True)
+            for name, df_final in final_frames.items():
+                validate_schema(df_final, FINAL_APPFOLIO_COLUMNS, f"bulk_bill_{name}", strict=True)
 
             # Business Validation Gate: Conteo seguro con na=False
-            unresolved_props = int(
-                df_amex_final["Bill Property Code*"].str.startswith("REVISAR PROP:", na=False).sum() +
-                df_citi_final["Bill Property Code*"].str.startswith("REVISAR PROP:", na=False).sum()
-            )
+            unresolved_props = int(sum(
+                df_final["Bill Property Code*"].str.startswith("REVISAR PROP:", na=False).sum()
+                for df_final in final_frames.values()
+            ))
             if unresolved_props > 0:
                 self.logger.warning(f"⚠️ Se detectaron {unresolved_props} propiedades no resueltas marcadas para revisión.")
 
             self.record_stage(
                 stage="bulk_bills_generation",
-                artifact=f"{AMEX_BULK_BILL.name} | {CITI_BULK_BILL.name}",
-                in_rows=len(df_amex_net) + len(df_citi_net),
-                out_rows=len(df_amex_final) + len(df_citi_final),
+                artifact=" | ".join(source.bulk_bill_path.name for source in STATEMENT_SOURCES.values()),
+                in_rows=sum(len(df) for df in netted_frames.values()),
+                out_rows=sum(len(df) for df in final_frames.values()),
                 warnings=gen_metrics.get("warnings", 0) + unresolved_props,
                 errors=0,
                 status="SUCCESS",
-                duration=time.time() - t0
+                duration=time.time() - t0,
+                cache_stats=rules.cache_stats()
             )
 
             self.logger.info(f"=== PIPELINE FINALIZADO CON ÉXITO EN {time.time() - total_start:.2f}s ===")
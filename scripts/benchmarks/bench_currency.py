@@ -0,0 +1,78 @@
+"""
+scripts/benchmarks/bench_currency.py
+Micro-benchmark del parser de importes compartido frente al reemplazo regex encadenado anterior.
+Mide texto con formato de extracto ("$1,234.50", "(12.00)", "12.50-") y columnas ya numéricas.
+"""
+
+import sys
+import time
+import random
+from pathlib import Path
+
+# --- BOOTSTRAP DE RUTA RAÍZ ---
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import numpy as np
+import pandas as pd
+
+from scripts.utils.currency import parse_currency
+
+
+def _legacy_clean_currency(series: pd.Series) -> pd.Series:
+    """Implementación previa (normalize_amex.clean_currency) como referencia."""
+    return (
+        pd.to_numeric(
+            series.astype(str).replace({r'\$': '', ',': '', r'\(': '-', r'\)': ''}, regex=True),
+            errors='coerce'
+        ).fillna(0.0).round(2)
+    )
+
+
+def _synthetic_amounts(size: int, seed: int = 11) -> pd.Series:
+    rng = random.Random(seed)
+    values = []
+    for _ in range(size):
+        amount = round(rng.uniform(0, 5_000), 2)
+        text = f"${amount:,.2f}" if rng.random() < 0.7 else f"{amount:.2f}"
+        if rng.random() < 0.2:
+            text = f"({text})"
+        values.append(text)
+    return pd.Series(values, dtype=object)
+
+
+def _timed(fn, series: pd.Series):
+    t0 = time.perf_counter()
+    result = fn(series)
+    return result, time.perf_counter() - t0
+
+
+def run(size: int = 1_000_000) -> dict:
+    text = _synthetic_amounts(size)
+    numeric = pd.Series(np.round(np.random.default_rng(11).uniform(-5_000, 5_000, size), 2))
+
+    legacy_text, legacy_text_sec = _timed(_legacy_clean_currency, text)
+    new_text, new_text_sec = _timed(parse_currency, text)
+    legacy_num, legacy_num_sec = _timed(_legacy_clean_currency, numeric)
+    new_num, new_num_sec = _timed(parse_currency, numeric)
+
+    report = {
+        "rows": size,
+        "text_legacy_sec": round(legacy_text_sec, 3),
+        "text_new_sec": round(new_text_sec, 3),
+        "text_speedup": round(legacy_text_sec / new_text_sec, 1) if new_text_sec else float("inf"),
+        "numeric_legacy_sec": round(legacy_num_sec, 3),
+        "numeric_new_sec": round(new_num_sec, 4),
+        "numeric_speedup": round(legacy_num_sec / new_num_sec, 1) if new_num_sec else float("inf"),
+        "identical": bool(
+            np.array_equal(legacy_text.to_numpy(), new_text.to_numpy())
+            and np.array_equal(legacy_num.to_numpy(), new_num.to_numpy())
+        )
+    }
+    print(f"📊 Parser de importes: {report}")
+    return report
+
+
+if __name__ == "__main__":
+    run()
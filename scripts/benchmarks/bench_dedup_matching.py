@@ -0,0 +1,98 @@
+"""
+scripts/benchmarks/bench_dedup_matching.py
+Benchmark del motor de emparejamiento factura -> cargo (centavos + búsqueda binaria) frente al
+bucle anterior, que re-filtraba y re-ordenaba todos los cargos del proveedor por cada factura.
+El bucle anterior se mide sobre una muestra de facturas y se extrapola al total.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# --- BOOTSTRAP DE RUTA RAÍZ ---
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import numpy as np
+import pandas as pd
+
+from scripts.reconciliation.dedup_appfolio import AMOUNT_TOLERANCE_CENTS
+from scripts.reconciliation.matching import CardAmountIndex, build_logical_invoices
+
+
+def _synthetic_frames(n_bills: int, n_card: int, seed: int = 17):
+    """Un único proveedor (peor caso): importes de un catálogo acotado para forzar colisiones."""
+    rng = np.random.default_rng(seed)
+    catalog = rng.integers(500, 90_000, size=max(n_card // 4, 1))
+    start = np.datetime64("2023-01-01")
+
+    card = pd.DataFrame({
+        "date": (start + rng.integers(0, 730, size=n_card)).astype(str),
+        "amount": rng.choice(catalog, size=n_card) / 100.0 * rng.choice([1, -1], size=n_card, p=[0.9, 0.1])
+    })
+    references = np.where(
+        rng.random(n_bills) < 0.3,
+        "INV" + rng.integers(0, n_bills // 3 + 1, size=n_bills).astype(str),
+        ""
+    )
+    bills = pd.DataFrame({
+        "unpaid_clean": rng.choice(catalog, size=n_bills) / 100.0,
+        "reference": references
+    })
+    return bills, card
+
+
+def _engine(bills: pd.DataFrame, card: pd.DataFrame) -> list:
+    card_index = CardAmountIndex(card, tolerance_cents=AMOUNT_TOLERANCE_CENTS)
+    return [card_index.take(invoice.amount_cents) for invoice in build_logical_invoices(bills)]
+
+
+def _legacy(bills: pd.DataFrame, card: pd.DataFrame, limit: int = None) -> list:
+    """Bucle anterior (filtro + sort_values por factura) con la misma tolerancia expresada en centavos."""
+    card_cents = np.rint(card["amount"].abs() * 100)
+    consumed = set()
+    matches = []
+    for invoice in build_logical_invoices(bills)[:limit]:
+        candidates = card[
+            (~card.index.isin(consumed))
+            & (np.abs(card_cents - invoice.amount_cents) <= AMOUNT_TOLERANCE_CENTS)
+        ].sort_values("date", kind="stable")
+        match_idx = candidates.index[0] if not candidates.empty else None
+        if match_idx is not None:
+            consumed.add(match_idx)
+        matches.append(match_idx)
+    return matches
+
+
+def run(n_bills: int = 100_000, n_card: int = 100_000, legacy_sample: int = 500, check_size: int = 3_000) -> dict:
+    # Equivalencia sobre un tamaño en el que el bucle anterior termina en segundos
+    small_bills, small_card = _synthetic_frames(check_size, check_size, seed=3)
+    identical = _engine(small_bills, small_card) == _legacy(small_bills, small_card)
+
+    bills, card = _synthetic_frames(n_bills, n_card)
+    t0 = time.perf_counter()
+    matches = _engine(bills, card)
+    engine_sec = time.perf_counter() - t0
+
+    n_invoices = len(build_logical_invoices(bills))
+    t0 = time.perf_counter()
+    _legacy(bills, card, limit=legacy_sample)
+    legacy_sec = (time.perf_counter() - t0) / legacy_sample * n_invoices
+
+    report = {
+        "bills": n_bills,
+        "card_rows": n_card,
+        "logical_invoices": n_invoices,
+        "matched": sum(m is not None for m in matches),
+        "engine_sec": round(engine_sec, 3),
+        "legacy_sec_extrapolated": round(legacy_sec, 1),
+        "speedup": round(legacy_sec / engine_sec, 1) if engine_sec else float("inf"),
+        "identical": identical
+    }
+    print(f"📊 Emparejamiento ledger/tarjeta: {report}")
+    return report
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,102 @@
+"""
+scripts/benchmarks/bench_vendor_normalize.py
+Micro-benchmark de normalize_vendor: implementación regex anterior aplicada fila a fila frente a la
+versión precompilada con caché LRU y la variante vectorizada normalize_vendor_series.
+"""
+
+import re
+import sys
+import time
+import random
+from pathlib import Path
+
+# --- BOOTSTRAP DE RUTA RAÍZ ---
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import pandas as pd
+from unidecode import unidecode
+
+from scripts.utils.text_cleaning import (
+    KEEP_THE,
+    clear_vendor_cache,
+    normalize_vendor,
+    normalize_vendor_series
+)
+
+
+def _legacy_normalize_vendor(text):
+    """Implementación previa (patrones recompilados en cada llamada) como referencia."""
+    if not isinstance(text, str) or text.strip() == "":
+        return ""
+    text = unidecode(text).lower().strip()
+    text = text.replace("-", " ").replace("*", " ")
+    text = re.sub(r"\d{3,}", " ", text)
+    text = re.sub(r"[^\w\s]", " ", text)
+    text = text.replace("hdwe", "hardware")
+    text = re.sub(r"\s+", " ", text).strip()
+    if text.startswith("the ") and text not in KEEP_THE:
+        text = text[4:]
+    if "amazon" in text or "amzn" in text:
+        return "amazon"
+    if "sherwin williams" in text:
+        return "sherwin williams"
+    if "home depot" in text:
+        return "the home depot"
+    text = re.sub(r"\b(miami|cleveland|fort lauderd[a-z]*|davie|hialeah|opa locka|north miami)\b", "", text)
+    text = re.sub(r"\b(fl|oh|ca|wa|tx|ny|pa|il|ga|nc|az|ma|mi)\b$", "", text).strip()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+_MERCHANTS = [
+    "THE HOME DEPOT #{n}", "SHERWIN-WILLIAMS{n}CLEVELAND", "ACE HDWE OF OPA LOCKA", "AMZN Mktp US*{n}",
+    "BRANDSMART USA", "7-ELEVEN {n} {n}", "USPS PO {n}", "IN *SWIFTPIX REAL ES", "Café Ñandú {n}",
+    "WINDOWS & DOORS {n}", "LOWE'S #{n}", "SHINEPAY LAUNDRY APP"
+]
+_CITIES = ["MIAMI               FL", "DAVIE FL", "HIALEAH FL", "CLEVELAND OH", "NORTH MIAMI FL", ""]
+
+
+def _synthetic_vendors(size: int, distinct: int = 20_000, seed: int = 7) -> pd.Series:
+    """Extracto sintético: `distinct` descriptores repetidos (como en extractos reales) más algunos nulos."""
+    rng = random.Random(seed)
+    pool = [
+        f"{rng.choice(_MERCHANTS).format(n=rng.randint(0, 99_999))} {rng.choice(_CITIES)}"
+        for _ in range(distinct)
+    ]
+    values = [rng.choice(pool) if rng.random() > 0.01 else None for _ in range(size)]
+    return pd.Series(values, dtype=object)
+
+
+def _timed(fn, series: pd.Series):
+    t0 = time.perf_counter()
+    result = fn(series)
+    return result, time.perf_counter() - t0
+
+
+def run(size: int = 1_000_000) -> dict:
+    vendors = _synthetic_vendors(size)
+
+    legacy, legacy_sec = _timed(lambda s: s.apply(_legacy_normalize_vendor), vendors)
+    clear_vendor_cache()
+    scalar, scalar_sec = _timed(lambda s: s.apply(normalize_vendor), vendors)
+    clear_vendor_cache()
+    vectorized, vectorized_sec = _timed(normalize_vendor_series, vendors)
+
+    report = {
+        "rows": size,
+        "distinct": int(vendors.nunique()),
+        "legacy_sec": round(legacy_sec, 3),
+        "cached_apply_sec": round(scalar_sec, 3),
+        "series_sec": round(vectorized_sec, 3),
+        "legacy_rows_per_sec": int(size / legacy_sec),
+        "series_rows_per_sec": int(size / vectorized_sec),
+        "speedup": round(legacy_sec / vectorized_sec, 1) if vectorized_sec else float("inf"),
+        "identical": bool(legacy.equals(scalar) and legacy.equals(vectorized))
+    }
+    print(f"📊 Normalización de vendors: {report}")
+    return report
+
+
+if __name__ == "__main__":
+    run()
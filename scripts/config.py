@@ -7,7 +7,7 @@ Módulo puro: sin lógica de negocio ni efectos secundarios en el sistema de arc
 import uuid
 from pathlib import Path
 from datetime import datetime
-from typing import List, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 # ==============================================================================
 # 1. ÁRBOL DE DIRECTORIOS INMUTABLE
@@ -19,12 +19,14 @@ RAW_DIR = DATA_DIR / "raw"
 CLEAN_DIR = DATA_DIR / "clean"
 MASTER_DIR = DATA_DIR / "master"
 
+CACHE_DIR = DATA_DIR / "cache"
+
 LOGS_DIR = PROJECT_ROOT / "logs"
 AUDIT_DIR = PROJECT_ROOT / "audit"
 
 def ensure_directories() -> None:
     """Crea explícitamente los directorios requeridos por el pipeline."""
-    for directory in (LOGS_DIR, AUDIT_DIR, CLEAN_DIR, RAW_DIR, MASTER_DIR):
+    for directory in (LOGS_DIR, AUDIT_DIR, CLEAN_DIR, RAW_DIR, MASTER_DIR, CACHE_DIR):
         directory.mkdir(parents=True, exist_ok=True)
 
 # ==============================================================================
@@ -44,14 +46,18 @@ GL_DIRECTORY = CLEAN_DIR / "normalized_gl_accounts.csv"
 PROPERTY_DIRECTORY = CLEAN_DIR / "normalized_property_directory.csv"
 VENDOR_DIRECTORY = CLEAN_DIR / "normalized_vendor_directory.csv"
 
-AMEX_NORMALIZED = CLEAN_DIR / "normalized_amex.csv"
-CITI_NORMALIZED = CLEAN_DIR / "normalized_citi.csv"
+# Formato de los artefactos intermedios entre etapas: "parquet", "feather" o "csv".
+# Sin pyarrow instalado, los formatos columnares se degradan a CSV (misma ruta con sufijo .csv).
+INTERMEDIATE_FORMAT: str = "parquet"
+
+AMEX_NORMALIZED = CLEAN_DIR / f"normalized_amex.{INTERMEDIATE_FORMAT}"
+CITI_NORMALIZED = CLEAN_DIR / f"normalized_citi.{INTERMEDIATE_FORMAT}"
 
 # ==============================================================================
 # 4. ARCHIVOS NETEADOS Y CONCILIADOS (IDEMPOTENTES)
 # ==============================================================================
-AMEX_NETTED = CLEAN_DIR / "amex_ras_net_of_appfolio.csv"
-CITI_NETTED = CLEAN_DIR / "citi_ras_net_of_appfolio.csv"
+AMEX_NETTED = CLEAN_DIR / f"amex_ras_net_of_appfolio.{INTERMEDIATE_FORMAT}"
+CITI_NETTED = CLEAN_DIR / f"citi_ras_net_of_appfolio.{INTERMEDIATE_FORMAT}"
 
 # ==============================================================================
 # 5. SALIDAS FINALES (BULK BILLS APPFOLIO Y AUDITORÍA DE FACTURAS)
@@ -60,6 +66,118 @@ AMEX_BULK_BILL = CLEAN_DIR / "appfolio_ras_bulk_bill_amex.csv"
 CITI_BULK_BILL = CLEAN_DIR / "appfolio_ras_bulk_bill_mastercard.csv"
 UNMATCHED_LEDGER_REPORT = CLEAN_DIR / "reporte_facturas_AppFolio_NO_encontradas.csv"
 
+# ==============================================================================
+# 5B. CACHÉS REGENERABLES (Seguros de borrar: se reconstruyen desde las fuentes)
+# ==============================================================================
+# Índices compilados de RulesManager, invalidados por hash/mtime de MAPPING_RULES y directorios
+RULES_SNAPSHOT = CACHE_DIR / "rules_snapshot.pkl"
+# Manifiestos de extractos ingeridos (por hash de contenido) y shards normalizados por archivo
+INGESTION_CACHE_DIR = CACHE_DIR / "ingestion"
+# Copias columnares de hojas Excel (mapping_rules, diccionario de entidades, extractos .xlsx)
+EXCEL_CACHE_DIR = CACHE_DIR / "excel"
+
+# ==============================================================================
+# 5C. PARÁMETROS DE EJECUCIÓN
+# ==============================================================================
+# Procesos para parsear extractos AMEX en paralelo (None = os.cpu_count(); 1 = secuencial)
+AMEX_LOAD_WORKERS: Optional[int] = None
+# Procesos para conciliar los bloques (tarjeta, proveedor) contra el ledger (None = os.cpu_count(); 1 = secuencial)
+DEDUP_WORKERS: Optional[int] = None
+# Reutiliza shards de extractos ya ingeridos; False fuerza el re-parseo completo de los crudos
+INCREMENTAL_INGESTION: bool = True
+# Filas por bloque al leer el extracto Citi en modo streaming (None = lectura completa en memoria)
+CITI_STREAMING_CHUNKSIZE: Optional[int] = None
+# Formatos de fecha candidatos (en orden de preferencia ante empates) para inferir el formato de cada extracto
+DATE_FORMAT_CANDIDATES: Tuple[str, ...] = (
+    "%Y-%m-%d",
+    "%m/%d/%Y",
+    "%m/%d/%y",
+    "%Y-%m-%d %H:%M:%S",
+    "%m/%d/%Y %H:%M:%S",
+    "%m-%d-%Y",
+    "%Y/%m/%d",
+    "%d/%m/%Y",
+    "%d-%b-%Y",
+    "%b %d, %Y"
+)
+# Valores distintos muestreados por columna para inferir (o validar) el formato de fecha
+DATE_INFERENCE_SAMPLE: int = 200
+# Días máximos entre la fecha de una factura del ledger y la del cargo de tarjeta para tratarlos como
+# duplicados (None = sin ventana). Las filas sin fecha interpretable no se restringen por ventana.
+DEDUP_DATE_WINDOW_DAYS: Optional[int] = 90
+# Columna del ledger (en minúsculas) de la que se mide la ventana; si falta se usa la primera con "date"
+LEDGER_BILL_DATE_COLUMN: str = "bill date"
+# Pagos fraccionados: máximo de cargos que pueden sumar una factura (< 2 desactiva la segunda pasada)
+# y nodos de búsqueda permitidos por factura antes de abandonarla
+DEDUP_SPLIT_MAX_CHARGES: int = 3
+DEDUP_SPLIT_SEARCH_BUDGET: int = 5_000
+# Ventana (días) de los cargos de un pago fraccionado respecto a la factura; más estrecha que la general
+# porque cuantos más cargos candidatos, más sumas casuales. Exige fecha en factura y cargos (None = ventana general)
+DEDUP_SPLIT_WINDOW_DAYS: Optional[int] = 7
+# Nombres de vendor distintos memoizados por normalize_vendor (LRU en memoria por proceso)
+VENDOR_NORMALIZE_CACHE_SIZE: int = 100_000
+# Motor Excel para lecturas no cacheadas: None = openpyxl (defecto de pandas); "calamine" si python-calamine está instalado
+EXCEL_ENGINE: Optional[str] = None
+
+# ==============================================================================
+# 5D. REGISTRO DE FUENTES DE EXTRACTOS (UNA ENTRADA POR TARJETA/EMISOR)
+# ==============================================================================
+class StatementSource(NamedTuple):
+    """
+    Declaración de una fuente de extractos. Agregar un emisor = agregar una entrada al registro
+    y un módulo normalizador con `run(rules) -> filas crudas`; el orquestador no cambia.
+    """
+    name: str                          # Identificador de etapa/auditoría (normalize_<name>, dedup_<name>)
+    card_key: str                      # Clave de cuenta de caja (hoja Rules, Category=CASH) y prefijo de Description
+    normalizer: str                    # Módulo importable que implementa run(rules)
+    raw_input: Path                    # Archivo o directorio de extractos crudos
+    column_mapping: Dict[str, str]     # Columnas crudas -> contrato canónico
+    company_filter: Optional[str]      # Valor exacto de company a conservar (None = filtro de titularidad Ownership)
+    normalized_path: Path
+    netted_path: Path
+    bulk_bill_path: Path
+
+
+STATEMENT_SOURCES: Dict[str, StatementSource] = {
+    "amex": StatementSource(
+        name="amex",
+        card_key="amex",
+        normalizer="scripts.ingestion.normalize_amex",
+        raw_input=AMEX_RAW_DIR,
+        # Sinónimos case-insensitive (las cabeceras AMEX se pasan a minúsculas al leer)
+        column_mapping={
+            "account": "account_holder",
+            "gl": "gl_account",
+            "desc": "merchant",
+            "description": "merchant"
+        },
+        company_filter=None,
+        normalized_path=AMEX_NORMALIZED,
+        netted_path=AMEX_NETTED,
+        bulk_bill_path=AMEX_BULK_BILL
+    ),
+    "citi": StatementSource(
+        name="citi",
+        card_key="mastercard",
+        normalizer="scripts.ingestion.normalize_citi",
+        raw_input=CITI_RAW_INPUT,
+        column_mapping={
+            "Date": "date",
+            "Description": "merchant",
+            "Debit": "debit",
+            "Credit": "credit",
+            "Company": "company"
+        },
+        company_filter="RAS",
+        normalized_path=CITI_NORMALIZED,
+        netted_path=CITI_NETTED,
+        bulk_bill_path=CITI_BULK_BILL
+    )
+}
+
+# Fuentes normalizadas en paralelo por el orquestador (None = todas las registradas a la vez)
+SOURCE_NORMALIZE_WORKERS: Optional[int] = None
+
 # ==============================================================================
 # 6. CONTRATOS DE ESQUEMA (SCHEMAS EXPLÍCITOS)
 # ==============================================================================
@@ -74,6 +192,19 @@ NORMALIZED_STATEMENT_SCHEMA: List[str] = [
     "property_hint"  
 ]
 
+# Tipos del contrato normalizado, aplicados al escribir y al leer artefactos intermedios.
+# Texto como object con "" -> nulo; `date` es datetime64 (timestamp en Parquet/Feather, texto ISO
+# YYYY-MM-DD solo en el respaldo CSV) y `amount` float64.
+NORMALIZED_STATEMENT_DTYPES: Dict[str, str] = {
+    "date": "datetime64[ns]",
+    "merchant": "object",
+    "account_holder": "object",
+    "amount": "float64",
+    "company": "object",
+    "gl_account": "object",
+    "property_hint": "object"
+}
+
 # Contrato estricto exigido por AppFolio para Bulk Bills
 FINAL_APPFOLIO_COLUMNS: List[str] = [
     "Bill Property Code*",
@@ -0,0 +1,167 @@
+"""
+scripts/fuzzy_match/candidate_index.py
+Índice invertido de bloques (tokens cortos y n-gramas de caracteres) para fuzzy matching sublineal.
+El scorer solo se ejecuta sobre las opciones que comparten al menos un bloque con la consulta.
+"""
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+try:
+    from rapidfuzz import process, fuzz
+except ImportError:
+    process = fuzz = None
+
+# Filas de consultas por bloque de cdist (acota la matriz en memoria)
+_CDIST_CHUNK_ROWS = 512
+# Máximo de celdas densas (consultas x unión) tolerado por cada par consulta-candidato real
+_DENSE_OVERHEAD_FACTOR = 4
+
+
+class FuzzyCandidateIndex:
+    """
+    Blocking sobre un catálogo normalizado.
+
+    - Cada token se indexa completo y, además, por sus n-gramas de caracteres.
+    - Los bloques presentes en más de `max_block_share` del catálogo (p.ej. "LLC", "MIAMI") se
+      ignoran mientras la consulta tenga otros bloques más selectivos.
+    - Catálogos menores a `min_catalog_size` no se bloquean: el escaneo completo ya es barato y exacto.
+    - Empates de puntaje se resuelven por orden original del catálogo, igual que extractOne.
+    """
+
+    def __init__(
+        self,
+        choices: Iterable[str],
+        ngram_size: int = 3,
+        max_block_share: float = 0.05,
+        min_catalog_size: int = 500
+    ):
+        self.choices: List[str] = list(choices)
+        self.ngram_size = ngram_size
+        self.max_block_share = max_block_share
+        self.blocking_enabled = len(self.choices) >= min_catalog_size
+        self._all_ids = np.arange(len(self.choices), dtype=np.int64)
+
+        postings: Dict[str, List[int]] = {}
+        if self.blocking_enabled:
+            for choice_id, choice in enumerate(self.choices):
+                for key in self._block_keys(choice):
+                    postings.setdefault(key, []).append(choice_id)
+        self._postings: Dict[str, np.ndarray] = {k: np.asarray(v, dtype=np.int64) for k, v in postings.items()}
+        self._max_block_size = max(1, int(len(self.choices) * max_block_share))
+
+    def __len__(self) -> int:
+        return len(self.choices)
+
+    def _block_keys(self, text: str) -> Set[str]:
+        n = self.ngram_size
+        keys: Set[str] = set()
+        for token in text.split():
+            keys.add(f"T:{token}")
+            keys.update(f"G:{token[i:i + n]}" for i in range(len(token) - n + 1))
+        return keys
+
+    def candidates(self, query: str) -> np.ndarray:
+        """Ids (ordenados) de las opciones que comparten al menos un bloque con la consulta."""
+        if not self.blocking_enabled:
+            return self._all_ids
+
+        blocks = [self._postings[k] for k in self._block_keys(query) if k in self._postings]
+        if not blocks:
+            return np.empty(0, dtype=np.int64)
+
+        selective = [b for b in blocks if len(b) <= self._max_block_size]
+        return np.unique(np.concatenate(selective or blocks))
+
+    def best_match(self, query: str, score_cutoff: int = 50) -> Tuple[Optional[str], float]:
+        """extractOne (token_set_ratio) restringido a los candidatos del bloque."""
+        if process is None or not query or not self.choices:
+            return None, 0.0
+
+        cand_ids = self.candidates(query)
+        if not len(cand_ids):
+            return None, 0.0
+
+        result = process.extractOne(
+            query,
+            [self.choices[i] for i in cand_ids],
+            scorer=fuzz.token_set_ratio,
+            score_cutoff=score_cutoff
+        )
+        if result is None:
+            return None, 0.0
+        return result[0], float(result[1])
+
+    def best_matches(self, queries: List[str], score_cutoff: int = 50, workers: int = -1) -> List[Tuple[Optional[str], float]]:
+        """
+        Versión por lotes con resultados idénticos a best_match.
+        Si los candidatos del bloque de consultas se solapan lo suficiente, puntúa la matriz densa
+        consultas x unión con process.cdist (multi-hilo) enmascarando pares sin bloque común;
+        si son dispersos, puntúa cada consulta solo contra sus propios candidatos.
+        """
+        if process is None or not queries or not self.choices:
+            return [(None, 0.0)] * len(queries)
+
+        results: List[Tuple[Optional[str], float]] = []
+        for start in range(0, len(queries), _CDIST_CHUNK_ROWS):
+            block = queries[start:start + _CDIST_CHUNK_ROWS]
+            per_query = [self.candidates(q) if q else np.empty(0, dtype=np.int64) for q in block]
+            pair_count = sum(len(c) for c in per_query)
+            if not pair_count:
+                results.extend([(None, 0.0)] * len(block))
+                continue
+
+            union = np.unique(np.concatenate(per_query))
+            if len(union) * len(block) > _DENSE_OVERHEAD_FACTOR * pair_count:
+                results.extend(self.best_match(q, score_cutoff=score_cutoff) for q in block)
+                continue
+
+            scores = process.cdist(
+                block, [self.choices[i] for i in union],
+                scorer=fuzz.token_set_ratio,
+                score_cutoff=score_cutoff,
+                dtype=np.float64,
+                workers=workers
+            )
+            allowed = np.zeros(scores.shape, dtype=bool)
+            for row, cand_ids in enumerate(per_query):
+                allowed[row, np.searchsorted(union, cand_ids)] = True
+            scores[~allowed] = -1.0
+
+            best_pos = scores.argmax(axis=1)
+            best_scores = scores[np.arange(len(block)), best_pos]
+            for pos, score in zip(best_pos, best_scores):
+                if score >= max(score_cutoff, 0):
+                    results.append((self.choices[union[pos]], float(score)))
+                else:
+                    results.append((None, 0.0))
+        return results
+
+    def recall_against_full_scan(self, queries: List[str], score_cutoff: int = 50) -> Dict[str, float]:
+        """
+        Auditoría de calidad del blocking: compara contra extractOne sobre el catálogo completo.
+        recall = fracción de matches del escaneo completo que el índice recupera con la misma opción.
+        """
+        if process is None:
+            return {"queries": len(queries), "full_scan_matches": 0, "recovered": 0, "recall": 1.0, "avg_candidates": 0.0}
+
+        full_matches = 0
+        recovered = 0
+        candidate_total = 0
+        for query in queries:
+            candidate_total += len(self.candidates(query)) if query else 0
+            full = process.extractOne(query, self.choices, scorer=fuzz.token_set_ratio, score_cutoff=score_cutoff) if query else None
+            if full is None:
+                continue
+            full_matches += 1
+            blocked, _ = self.best_match(query, score_cutoff=score_cutoff)
+            recovered += int(blocked == full[0])
+
+        return {
+            "queries": len(queries),
+            "full_scan_matches": full_matches,
+            "recovered": recovered,
+            "recall": recovered / full_matches if full_matches else 1.0,
+            "avg_candidates": candidate_total / len(queries) if queries else 0.0
+        }
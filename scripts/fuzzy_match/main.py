@@ -13,9 +13,11 @@ from scripts.config import (
     AMEX_BULK_BILL,
     CITI_BULK_BILL,
     LOGS_DIR,
-    FINAL_APPFOLIO_COLUMNS
+    FINAL_APPFOLIO_COLUMNS,
+    NORMALIZED_STATEMENT_DTYPES
 )
 from scripts.rules_manager import RulesManager
+from scripts.utils.artifact_io import read_artifact, resolve_artifact_path
 
 
 def write_audit_log(df_errors: pd.DataFrame, log_filename: Path) -> None:
@@ -76,10 +78,10 @@ def process_card_dataset(
     rules: RulesManager, 
     audit_log: Path
 ) -> Tuple[int, int]:
-    if not input_file.exists():
+    if not resolve_artifact_path(input_file).exists():
         return 0, 0
 
-    df = pd.read_csv(input_file)
+    df = read_artifact(input_file, NORMALIZED_STATEMENT_DTYPES)
     if df.empty:
         pd.DataFrame(columns=FINAL_APPFOLIO_COLUMNS).to_csv(output_file, index=False, encoding="utf-8-sig")
         return 0, 0
@@ -120,14 +122,17 @@ def process_card_dataset(
     # 5. Ensamble Final con contrato AppFolio
     cash_account = rules.resolve_cash_account(card_key)
 
+    # Las fechas viajan tipadas entre etapas; el texto ISO solo se genera para el archivo de AppFolio
+    bill_dates = pd.to_datetime(df_netted["date"]).dt.strftime("%Y-%m-%d")
+
     final_df = pd.DataFrame({
         "Bill Property Code*": df_netted["resolved_property"],
         "Vendor Payee Name*": df_netted["resolved_vendor"],
         "Amount*": df_netted["amount"],
         "Bill Account*": df_netted["resolved_vendor"].apply(rules.resolve_gl),
-        "Bill Date*": df_netted["date"],
-        "Due Date*": df_netted["date"],
-        "Posting Date": df_netted["date"],
+        "Bill Date*": bill_dates,
+        "Due Date*": bill_dates,
+        "Posting Date": bill_dates,
         "Description": (
             card_key.upper() + " | " + 
             df_netted["merchant"].astype(str) + " | " + 
@@ -1,5 +1,10 @@
 import pandas as pd
-from scripts.utils.text_cleaning import normalize_vendor as normalize
+from pathlib import Path
+from typing import Dict
+from scripts.utils.excel_cache import read_excel_cached
+from scripts.utils.pattern_matcher import MultiPatternMatcher
+from scripts.utils.text_cleaning import normalize_vendor as normalize, normalize_vendor_series
+from scripts.utils.unique_values import map_unique
 import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
@@ -35,36 +40,67 @@ MANUAL_VENDOR_RULES = {
 def load_vendor_gl_map(path: str) -> pd.DataFrame:
   
     if path.endswith(".xlsx"):
-        df = pd.read_excel(path)
+        df = read_excel_cached(Path(path))
     else:
         df = pd.read_csv(path)
     
-    df["vendor_norm"] = df["vendor"].fillna("").apply(normalize)
+    df["vendor_norm"] = normalize_vendor_series(df["vendor"].fillna(""))
     return df
 
+class VendorGLLookup:
+    """
+    Compiled GL lookup built once from a vendor_gl_map:
+    - hash index vendor_norm -> gl_account (first row wins, like the previous mask + iloc[0])
+    - Aho-Corasick matcher over MANUAL_VENDOR_RULES keys (first rule in dict order wins)
+    """
+
+    def __init__(self, vendor_gl_map: pd.DataFrame, manual_rules: Dict[str, str] = MANUAL_VENDOR_RULES):
+        self.gl_by_vendor: Dict[str, object] = {}
+        for vendor_norm, gl_account in zip(vendor_gl_map["vendor_norm"], vendor_gl_map["gl_account"]):
+            self.gl_by_vendor.setdefault(vendor_norm, gl_account)
+        # Keys are matched as written (raw keys with uppercase/spacing never hit normalized text)
+        self.manual_matcher: MultiPatternMatcher[str] = MultiPatternMatcher(manual_rules.items())
+
+    @classmethod
+    def from_path(cls, path: str) -> "VendorGLLookup":
+        return cls(load_vendor_gl_map(path))
+
+    def apply_manual_rules(self, vendor_name: str) -> str:
+        clean_name = self.manual_matcher.first_match(normalize(vendor_name))
+        return vendor_name if clean_name is None else clean_name
+
+    def assign_gl_account(self, vendor_name: str) -> str | None:
+        vendor_norm = normalize(self.apply_manual_rules(vendor_name))
+        return self.gl_by_vendor.get(vendor_norm)
+
+    def assign_gl_accounts(self, vendors: pd.Series) -> pd.Series:
+        """Batch version of assign_gl_account (None where no GL is found)."""
+        return map_unique(vendors, self.assign_gl_account, self.assign_gl_account(None))
+
+
 def apply_manual_rules(vendor_name: str) -> str:
     """
     Apply manual rules to map problematic vendor names to a clean version.
     """
-    norm = normalize(vendor_name)
-    for key, clean_name in MANUAL_VENDOR_RULES.items():
-        if key in norm:
-            return clean_name
-    return vendor_name  
+    return _MANUAL_RULES_LOOKUP.apply_manual_rules(vendor_name)
 
-def assign_gl_account(vendor_name: str, vendor_gl_map: pd.DataFrame) -> str | None:
+def assign_gl_account(vendor_name: str, vendor_gl_map: pd.DataFrame | VendorGLLookup) -> str | None:
     """
     Try to assign a GL account to a vendor name using:
     1. Manual rules
     2. Exact normalized lookup in vendor_gl_map
+    Pass a VendorGLLookup (built once) when assigning many vendors.
     """
-    # Apply manual rules
-    vendor_clean = apply_manual_rules(vendor_name)
-    vendor_norm = normalize(vendor_clean)
+    if not isinstance(vendor_gl_map, VendorGLLookup):
+        vendor_gl_map = VendorGLLookup(vendor_gl_map)
+    return vendor_gl_map.assign_gl_account(vendor_name)
+
+def assign_gl_accounts(vendors: pd.Series, vendor_gl_map: pd.DataFrame | VendorGLLookup) -> pd.Series:
+    """Batch GL assignment for a whole Series of vendor names (e.g. full-ledger backfills)."""
+    if not isinstance(vendor_gl_map, VendorGLLookup):
+        vendor_gl_map = VendorGLLookup(vendor_gl_map)
+    return vendor_gl_map.assign_gl_accounts(vendors)
 
-    # Look match to vendor_gl_map
-    row = vendor_gl_map[vendor_gl_map["vendor_norm"] == vendor_norm]
-    if not row.empty:
-        return row.iloc[0]["gl_account"]
 
-    return None
\ No newline at end of file
+# Matcher for the module-level apply_manual_rules (no vendor map needed)
+_MANUAL_RULES_LOOKUP = VendorGLLookup(pd.DataFrame({"vendor_norm": [], "gl_account": []}))
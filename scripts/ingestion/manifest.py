@@ -0,0 +1,131 @@
+"""
+scripts/ingestion/manifest.py
+Manifiesto de ingesta incremental: registra los extractos crudos ya procesados por hash de contenido
+y conserva un shard normalizado por archivo, de modo que cada corrida solo parsea lo nuevo o modificado.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+from scripts.config import INGESTION_CACHE_DIR
+from scripts.utils.fingerprint import describe_source, source_unchanged
+
+_MANIFEST_VERSION = 1
+
+
+class IngestionManifest:
+    """
+    Manifiesto por fuente (amex, citi, ...) persistido en `<cache_dir>/<source>_manifest.json`.
+
+    - `files`: ruta cruda -> firma (mtime/tamaño) + sha256. La firma evita re-hashear archivos intactos.
+    - `shards`: id de shard -> filas crudas/normalizadas. El id combina el hash de contenido con
+      `fingerprint`, la huella de todo lo que altera la normalización (reglas, versión del formato),
+      por lo que cambiar las reglas invalida los shards sin tocar los crudos.
+    - `date_format`: último formato de fecha inferido para la fuente; se valida antes de reutilizarlo.
+    """
+
+    def __init__(self, source: str, fingerprint: str, cache_dir: Path = INGESTION_CACHE_DIR):
+        self.source = source
+        self.fingerprint = fingerprint
+        self.manifest_path = cache_dir / f"{source}_manifest.json"
+        self.shard_dir = cache_dir / source
+        self.files: Dict[str, Dict[str, object]] = {}
+        self.shards: Dict[str, Dict[str, int]] = {}
+        self.date_format: Optional[str] = None
+        self._load()
+
+    def _load(self) -> None:
+        if not self.manifest_path.exists():
+            return
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != _MANIFEST_VERSION:
+            return
+        self.files = data.get("files", {})
+        self.shards = data.get("shards", {})
+        self.date_format = data.get("date_format")
+
+    def save(self) -> None:
+        """Persiste el manifiesto de forma atómica (escritura temporal + replace)."""
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            payload = {
+                "version": _MANIFEST_VERSION,
+                "files": self.files,
+                "shards": self.shards,
+                "date_format": self.date_format
+            }
+            json.dump(payload, fh, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    # ==============================================================================
+    # IDENTIDAD DE ARCHIVOS Y SHARDS
+    # ==============================================================================
+    def content_hash(self, filepath: str) -> str:
+        """sha256 del archivo; reutiliza el registrado si mtime/tamaño no cambiaron."""
+        key = str(filepath)
+        recorded = self.files.get(key)
+        if recorded is not None and source_unchanged(Path(filepath), recorded):
+            return str(recorded["sha256"])
+        description = describe_source(Path(filepath))
+        self.files[key] = description
+        return str(description["sha256"])
+
+    def shard_id(self, filepath: str) -> str:
+        return f"{self.content_hash(filepath)}_{self.fingerprint[:16]}"
+
+    def _shard_path(self, shard_id: str) -> Path:
+        return self.shard_dir / f"{shard_id}.pkl"
+
+    # ==============================================================================
+    # LECTURA / ESCRITURA DE SHARDS
+    # ==============================================================================
+    def load_shard(self, filepath: str) -> Optional[Tuple[pd.DataFrame, int, int]]:
+        """
+        (shard normalizado, filas crudas, fechas coercionadas a NaT) si el contenido ya fue ingerido
+        con la misma huella; si no, None.
+        """
+        shard_id = self.shard_id(filepath)
+        meta = self.shards.get(shard_id)
+        shard_path = self._shard_path(shard_id)
+        if meta is None or not shard_path.exists():
+            return None
+        try:
+            shard = pd.read_pickle(shard_path)
+        except Exception:
+            return None
+        return shard, int(meta["raw_rows"]), int(meta.get("date_coerced", 0))
+
+    def store_shard(self, filepath: str, shard: pd.DataFrame, raw_rows: int, date_coerced: int = 0) -> None:
+        shard_id = self.shard_id(filepath)
+        shard_path = self._shard_path(shard_id)
+        shard_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = shard_path.with_suffix(".pkl.tmp")
+        shard.to_pickle(tmp_path)
+        os.replace(tmp_path, shard_path)
+        self.shards[shard_id] = {"raw_rows": int(raw_rows), "rows": len(shard), "date_coerced": int(date_coerced)}
+
+    def prune(self, present_files: Iterable[str]) -> int:
+        """
+        Olvida archivos que ya no están en el directorio crudo y borra los shards que ningún archivo
+        presente referencia (contenido reemplazado o huella de reglas obsoleta). Devuelve shards borrados.
+        """
+        present = {str(f) for f in present_files}
+        self.files = {k: v for k, v in self.files.items() if k in present}
+        live = {f"{v['sha256']}_{self.fingerprint[:16]}" for v in self.files.values()}
+
+        removed = 0
+        for shard_id in list(self.shards):
+            if shard_id not in live:
+                self.shards.pop(shard_id)
+                self._shard_path(shard_id).unlink(missing_ok=True)
+                removed += 1
+        return removed
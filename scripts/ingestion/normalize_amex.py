@@ -5,92 +5,172 @@ Estandariza y valida extractos crudos de American Express.
 
 import os
 import glob
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
 import pandas as pd
 
 from scripts.config import (
-    AMEX_RAW_DIR,
-    AMEX_NORMALIZED,
-    NORMALIZED_STATEMENT_SCHEMA
+    AMEX_LOAD_WORKERS,
+    INCREMENTAL_INGESTION,
+    NORMALIZED_STATEMENT_DTYPES,
+    NORMALIZED_STATEMENT_SCHEMA,
+    STATEMENT_SOURCES
 )
+from scripts.ingestion.manifest import IngestionManifest
 from scripts.rules_manager import RulesManager
+from scripts.utils.artifact_io import write_artifact
+from scripts.utils.currency import parse_currency
+from scripts.utils.dates import parse_dates
+from scripts.utils.excel_cache import CachedExcelFile
+from scripts.utils.fingerprint import payload_fingerprint
+from scripts.utils.unique_values import map_unique
 
+SOURCE = STATEMENT_SOURCES["amex"]
 
 CANONICAL_RAW_COLUMNS = ['date', 'merchant', 'account_holder', 'column', 'amount', 'company', 'gl_account']
 
 
-def clean_currency(series: pd.Series) -> pd.Series:
-    return (
-        pd.to_numeric(
-            series.astype(str).replace({r'\$': '', ',': '', r'\(': '-', r'\)': ''}, regex=True),
-            errors='coerce'
-        ).fillna(0.0).round(2)
-    )
-
+# Filas iniciales inspeccionadas para localizar la cabecera (DATE + AMOUNT)
+HEADER_SNIFF_ROWS = 15
 
-def load_amex_file(filepath: str) -> pd.DataFrame:
-    ext = filepath.lower().split('.')[-1]
-    raw = pd.read_excel(filepath, header=None) if ext in ["xlsx", "xls"] else pd.read_csv(filepath, header=None)
 
-    header_row = None
-    for i in range(min(15, len(raw))):
-        row_str = " ".join(str(v).upper() for v in raw.iloc[i].values)
+def detect_header_row(preview: pd.DataFrame) -> Optional[int]:
+    """Índice de la primera fila que contiene DATE y AMOUNT dentro de la vista previa."""
+    for i in range(min(HEADER_SNIFF_ROWS, len(preview))):
+        row_str = " ".join(str(v).upper() for v in preview.iloc[i].values)
         if "DATE" in row_str and "AMOUNT" in row_str:
-            header_row = i
-            break
+            return i
+    return None
 
-    if header_row is not None:
-        df = pd.read_excel(filepath, header=header_row) if ext in ["xlsx", "xls"] else pd.read_csv(filepath, header=header_row)
+
+def load_amex_file(filepath: str) -> pd.DataFrame:
+    """
+    Lee un extracto localizando la cabecera con una vista previa de HEADER_SNIFF_ROWS filas,
+    de modo que el archivo completo se parsea una sola vez. Para Excel, el libro se abre una vez
+    y ambas lecturas reutilizan el mismo libro, servidas desde la caché columnar cuando existe.
+    """
+    ext = filepath.lower().split('.')[-1]
+    if ext in ["xlsx", "xls"]:
+        with CachedExcelFile(filepath) as excel:
+            header_row = detect_header_row(excel.parse(header=None, nrows=HEADER_SNIFF_ROWS))
+            df = excel.parse(header=header_row)
     else:
-        df = raw.copy()
+        header_row = detect_header_row(pd.read_csv(filepath, header=None, nrows=HEADER_SNIFF_ROWS))
+        df = pd.read_csv(filepath, header=header_row)
+
+    if header_row is None:
         df.columns = CANONICAL_RAW_COLUMNS + [f"extra_{i}" for i in range(df.shape[1] - len(CANONICAL_RAW_COLUMNS))]
 
     df.columns = df.columns.str.lower().str.strip()
     return df
 
 
-def apply_business_rules(df: pd.DataFrame) -> pd.DataFrame:
-    def validate_row(row):
-        acc = str(row.get('account_holder', '')).upper().strip()
-        merc = str(row.get('merchant', '')).upper()
-        comp = str(row.get('company', '')).upper()
-        gl = str(row.get('gl_account', '')).upper()
+def _timed_load(filepath: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Carga un extracto midiendo su duración (función de módulo: serializable para el pool)."""
+    t0 = time.perf_counter()
+    df = load_amex_file(filepath)
+    return df, {
+        "file": os.path.basename(filepath),
+        "rows": len(df),
+        "seconds": round(time.perf_counter() - t0, 3)
+    }
+
 
-        is_armando = "ARMANDO ARMAS" in acc or (acc in ["", "NAN"] and "ARMANDO ARMAS" in merc)
-        is_richard = "RICHARD LIBUTTI" in acc or (acc in ["", "NAN"] and "RICHARD LIBUTTI" in merc)
-        is_ras_marked = any(x in comp or x in gl for x in ["RAS", "REITER"])
+def load_amex_files(files: List[str], workers: Optional[int] = AMEX_LOAD_WORKERS) -> Tuple[List[pd.DataFrame], List[Dict[str, Any]]]:
+    """
+    Parsea los extractos en un pool de procesos (el parseo Excel es CPU-bound).
+    Devuelve los frames en el mismo orden que `files` (pool.map preserva el orden de entrada)
+    junto con el reporte por archivo de filas y segundos.
+    Los workers se crean con "spawn": la etapa 2 llama a esta función desde un hilo mientras otras
+    fuentes normalizan en paralelo, y un fork heredaría locks (logging, imports, allocator) tomados por esos hilos.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(files)))
 
-        if is_richard and "HAPPY TRAILERS" in comp:
-            return "SKIP"
+    if workers == 1:
+        results = [_timed_load(f) for f in files]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(_timed_load, files))
 
-        if is_ras_marked or is_armando or is_richard:
-            return "KEEP"
-        return "SKIP"
+    frames = [df for df, _ in results]
+    report = [info for _, info in results]
+    return frames, report
 
-    df = df.copy()
-    status = df.apply(validate_row, axis=1)
-    return df[status == "KEEP"].copy()
 
+def compute_ownership_status(df: pd.DataFrame, ownership_rules: Dict[str, list]) -> pd.Series:
+    """
+    Filtro de titularidad vectorizado (KEEP/SKIP) con máscaras de texto por columna:
+    - KEEP si la transacción está marcada (markers en company/gl) o pertenece a un titular
+      autorizado (en account_holder, o en merchant cuando account_holder viene vacío).
+    - SKIP prioritario si un titular coincide con una exclusión de company (p.ej. Happy Trailers).
+    """
+    def upper_col(col: str) -> pd.Series:
+        # str(valor).upper() (nulos -> "NAN", como str(nan))
+        if col not in df.columns:
+            return pd.Series("", index=df.index, dtype=object)
+        return map_unique(df[col], lambda value: str(value).upper(), "NAN")
 
-def run(rules: RulesManager) -> int:
-    """Función de entrada llamada por run_pipeline.py."""
-    files = glob.glob(os.path.join(AMEX_RAW_DIR, "*.csv")) + glob.glob(os.path.join(AMEX_RAW_DIR, "*.xlsx"))
-    if not files:
-        empty_df = pd.DataFrame(columns=NORMALIZED_STATEMENT_SCHEMA)
-        empty_df.to_csv(AMEX_NORMALIZED, index=False, encoding="utf-8-sig")
-        return 0
-
-    dfs = [load_amex_file(f) for f in files]
-    amex = pd.concat(dfs, ignore_index=True)
-    raw_rows = len(amex)
-
-    # 1. Mapeo case-insensitive de sinónimos de columnas crudas
-    column_synonyms = {
-        "account": "account_holder",
-        "gl": "gl_account",
-        "desc": "merchant",
-        "description": "merchant"
+    acc = upper_col("account_holder").str.strip()
+    merc = upper_col("merchant")
+    comp = upper_col("company")
+    gl = upper_col("gl_account")
+
+    no_holder = acc.isin(["", "NAN"]).to_numpy()
+    false_mask = np.zeros(len(df), dtype=bool)
+
+    def contains(series: pd.Series, keyword: str) -> np.ndarray:
+        return series.str.contains(keyword, regex=False).to_numpy(dtype=bool)
+
+    owner_masks = {
+        owner: contains(acc, owner) | (no_holder & contains(merc, owner))
+        for owner in dict.fromkeys(ownership_rules.get("owners", []) + [o for o, _ in ownership_rules.get("exclusions", [])])
     }
 
+    is_owner = false_mask.copy()
+    for owner in ownership_rules.get("owners", []):
+        is_owner |= owner_masks[owner]
+
+    is_marked = false_mask.copy()
+    for marker in ownership_rules.get("markers", []):
+        is_marked |= contains(comp, marker) | contains(gl, marker)
+
+    is_excluded = false_mask.copy()
+    for owner, company_kw in ownership_rules.get("exclusions", []):
+        is_excluded |= owner_masks[owner] & contains(comp, company_kw)
+
+    keep = (is_marked | is_owner) & ~is_excluded
+    return pd.Series(np.where(keep, "KEEP", "SKIP"), index=df.index)
+
+
+def apply_business_rules(df: pd.DataFrame, rules: Optional[RulesManager] = None) -> pd.DataFrame:
+    """Aplica el filtro de titularidad definido en la hoja 'Ownership' (o los valores por defecto)."""
+    ownership_rules = rules.ownership_rules if rules is not None else RulesManager._DEFAULT_OWNERSHIP_RULES
+    status = compute_ownership_status(df, ownership_rules)
+    return df[status == "KEEP"].copy()
+
+
+# Versión del formato de shard: incrementarla cuando cambie la lógica de normalización
+_SHARD_FORMAT_VERSION = 4
+
+
+def normalize_amex_frame(
+    amex: pd.DataFrame,
+    rules: Optional[RulesManager] = None,
+    date_format: Optional[str] = None
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Normaliza un extracto crudo (un archivo) al contrato NORMALIZED_STATEMENT_SCHEMA.
+    `date_format` es el formato conocido de la fuente; devuelve también el reporte de parseo de fechas.
+    """
+    # 1. Mapeo case-insensitive de sinónimos de columnas crudas (registro de fuentes en config)
+    column_synonyms = SOURCE.column_mapping
+
     renames = {
         col: column_synonyms[col.strip().lower()]
         for col in amex.columns
@@ -99,14 +179,15 @@ def run(rules: RulesManager) -> int:
     amex = amex.rename(columns=renames)
 
     # 2. Asegurar presencia y formato seguro de columnas requeridas
-    required_columns = ["account_holder", "company", "gl_account", "merchant", "amount", "date"]
+    required_columns = ["account_holder", "company", "gl_account", "merchant", "date"]
     for col in required_columns:
         if col not in amex.columns:
             amex[col] = ""
         else:
             amex[col] = amex[col].fillna("").astype(str)
 
-    amex["amount"] = clean_currency(amex["amount"])
+    # El importe se parsea desde el valor crudo (sin pasar por texto si la columna ya es numérica)
+    amex["amount"] = parse_currency(amex["amount"]) if "amount" in amex.columns else 0.0
 
     # 3. Deduplicación por transacción exacta
     key_cols = ["date", "merchant", "amount"]
@@ -120,14 +201,85 @@ def run(rules: RulesManager) -> int:
     amex = amex.drop_duplicates("dedup_key").copy()
 
     # 4. Filtro de negocio RAS
-    amex = apply_business_rules(amex)
+    amex = apply_business_rules(amex, rules)
 
     # 5. Construcción canónica del schema y property_hint
-    amex["date"] = pd.to_datetime(amex["date"], errors="coerce").dt.strftime("%Y-%m-%d")
+    dates, date_report = parse_dates(amex["date"], format_hint=date_format)
+    amex["date"] = dates.dt.normalize()
 
     gl_clean = amex["gl_account"].str.strip()
     amex["property_hint"] = amex["gl_account"].where(gl_clean != "", amex["company"])
 
-    final_amex = amex[NORMALIZED_STATEMENT_SCHEMA].copy()
-    final_amex.to_csv(AMEX_NORMALIZED, index=False, encoding="utf-8-sig")
-    return raw_rows
\ No newline at end of file
+    return amex[NORMALIZED_STATEMENT_SCHEMA].copy(), date_report
+
+
+def shard_fingerprint(rules: Optional[RulesManager] = None) -> str:
+    """Huella de todo lo que altera un shard AMEX: formato, mapeo de columnas y reglas de titularidad vigentes."""
+    ownership_rules = rules.ownership_rules if rules is not None else RulesManager._DEFAULT_OWNERSHIP_RULES
+    return payload_fingerprint({
+        "version": _SHARD_FORMAT_VERSION,
+        "column_mapping": SOURCE.column_mapping,
+        "ownership_rules": ownership_rules
+    })
+
+
+def run(
+    rules: RulesManager,
+    workers: Optional[int] = AMEX_LOAD_WORKERS,
+    incremental: bool = INCREMENTAL_INGESTION
+) -> Dict[str, int]:
+    """
+    Función de entrada llamada por run_pipeline.py.
+    En modo incremental solo se parsean los extractos nuevos o modificados; el resto se toma de sus
+    shards normalizados y todos se concatenan en el orden de archivos para producir SOURCE.normalized_path.
+    Devuelve las filas crudas leídas y las fechas coercionadas a NaT (incluidas las de shards reutilizados).
+    """
+    # Orden determinístico de archivos (y por ende de filas) entre corridas
+    files = sorted(glob.glob(os.path.join(SOURCE.raw_input, "*.csv"))) + sorted(glob.glob(os.path.join(SOURCE.raw_input, "*.xlsx")))
+    manifest = IngestionManifest(SOURCE.name, shard_fingerprint(rules)) if incremental else None
+
+    if not files:
+        if manifest is not None:
+            manifest.prune(files)
+            manifest.save()
+        write_artifact(pd.DataFrame(columns=NORMALIZED_STATEMENT_SCHEMA), SOURCE.normalized_path, NORMALIZED_STATEMENT_DTYPES)
+        return {"raw_rows": 0, "date_coerced": 0}
+
+    # ruta -> (shard normalizado, filas crudas, fechas coercionadas a NaT)
+    shards: Dict[str, Tuple[pd.DataFrame, int, int]] = {}
+    if manifest is not None:
+        for filepath in files:
+            cached = manifest.load_shard(filepath)
+            if cached is not None:
+                shards[filepath] = cached
+    pending = [f for f in files if f not in shards]
+    if shards:
+        print(f"♻️  AMEX: {len(shards)} extractos sin cambios reutilizados desde el manifiesto")
+
+    if pending:
+        dfs, load_report = load_amex_files(pending, workers=workers)
+        date_format = manifest.date_format if manifest is not None else None
+        for filepath, raw, info in zip(pending, dfs, load_report):
+            print(f"📄 AMEX {info['file']}: {info['rows']} filas en {info['seconds']:.2f}s")
+            shard, date_report = normalize_amex_frame(raw, rules, date_format=date_format)
+            date_format = date_report["format"] or date_format
+            shards[filepath] = (shard, len(raw), date_report["coerced"])
+            if manifest is not None:
+                manifest.store_shard(filepath, shard, raw_rows=len(raw), date_coerced=date_report["coerced"])
+        if manifest is not None:
+            manifest.date_format = date_format
+
+    if manifest is not None:
+        manifest.prune(files)
+        manifest.save()
+
+    for filepath in files:
+        if shards[filepath][2]:
+            print(f"⚠️  AMEX {os.path.basename(filepath)}: {shards[filepath][2]} fechas no interpretables (NaT)")
+
+    final_amex = pd.concat([shards[f][0] for f in files], ignore_index=True)
+    write_artifact(final_amex, SOURCE.normalized_path, NORMALIZED_STATEMENT_DTYPES)
+    return {
+        "raw_rows": sum(shards[f][1] for f in files),
+        "date_coerced": sum(shards[f][2] for f in files)
+    }
@@ -3,52 +3,51 @@ scripts/ingestion/normalize_citi.py
 Estandariza y valida extractos de Citi Mastercard.
 """
 
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
 import pandas as pd
 from scripts.config import (
-    CITI_RAW_INPUT,
-    CITI_NORMALIZED,
-    NORMALIZED_STATEMENT_SCHEMA
+    CITI_STREAMING_CHUNKSIZE,
+    INCREMENTAL_INGESTION,
+    NORMALIZED_STATEMENT_DTYPES,
+    NORMALIZED_STATEMENT_SCHEMA,
+    STATEMENT_SOURCES
 )
+from scripts.ingestion.manifest import IngestionManifest
 from scripts.rules_manager import RulesManager
+from scripts.utils.artifact_io import ArtifactWriter, write_artifact
+from scripts.utils.currency import parse_currency_cents
+from scripts.utils.dates import parse_dates
+from scripts.utils.fingerprint import payload_fingerprint
 
-
-def clean_currency(series: pd.Series) -> pd.Series:
-    return (
-        pd.to_numeric(
-            series.astype(str).replace({r'\$': '', ',': '', r'\(': '-', r'\)': ''}, regex=True),
-            errors='coerce'
-        ).fillna(0.0)
-    )
+SOURCE = STATEMENT_SOURCES["citi"]
 
 
-def run(rules: RulesManager = None) -> int:
-    """Función de entrada llamada por run_pipeline.py."""
-    if not CITI_RAW_INPUT.exists():
-        empty_df = pd.DataFrame(columns=NORMALIZED_STATEMENT_SCHEMA)
-        empty_df.to_csv(CITI_NORMALIZED, index=False, encoding="utf-8-sig")
-        return 0
+# Versión del formato de shard: incrementarla cuando cambie la lógica de normalización
+_SHARD_FORMAT_VERSION = 4
 
-    df_raw = pd.read_csv(CITI_RAW_INPUT)
-    raw_rows = len(df_raw)
 
-    column_mapping = {
-        'Date': 'date', 'Description': 'merchant',
-        'Debit': 'debit', 'Credit': 'credit', 'Company': 'company'
-    }
-
-    df_calc = df_raw.rename(columns=column_mapping).copy()
+def normalize_citi_frame(df_raw: pd.DataFrame, date_format: Optional[str] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Normaliza un extracto crudo de Citi al contrato NORMALIZED_STATEMENT_SCHEMA.
+    Las filas RAS sin fecha interpretable se descartan y quedan contabilizadas en el reporte de fechas.
+    """
+    df_calc = df_raw.rename(columns=SOURCE.column_mapping).copy()
     
     # Inicialización segura de débitos y créditos
     debit_series = df_calc['debit'] if 'debit' in df_calc.columns else pd.Series(0, index=df_calc.index)
     credit_series = df_calc['credit'] if 'credit' in df_calc.columns else pd.Series(0, index=df_calc.index)
     
-    df_calc['amount'] = (clean_currency(debit_series) - clean_currency(credit_series)).round(2)
+    # Neteo exacto en centavos enteros
+    df_calc['amount'] = (parse_currency_cents(debit_series) - parse_currency_cents(credit_series)) / 100.0
 
-    # Filtrar solo segmento RAS
+    # Filtrar solo el segmento declarado en el registro (RAS)
     comp_series = df_calc.get('company', pd.Series("", index=df_calc.index))
-    df_ras = df_calc[comp_series.astype(str).str.upper() == "RAS"].copy()
+    df_ras = df_calc[comp_series.astype(str).str.upper() == SOURCE.company_filter.upper()].copy()
 
-    df_ras['date'] = pd.to_datetime(df_ras['date'], errors='coerce').dt.strftime("%Y-%m-%d")
+    dates, date_report = parse_dates(df_ras['date'], format_hint=date_format)
+    df_ras['date'] = dates.dt.normalize()
     df_ras = df_ras[df_ras['date'].notna()].copy()
 
     # Columnas complementarias para cumplir el contrato canónico
@@ -58,6 +57,97 @@ def run(rules: RulesManager = None) -> int:
     df_ras['company'] = df_ras.get('company', "").fillna("").astype(str)
     df_ras['property_hint'] = df_ras['company']
 
-    final_citi = df_ras[NORMALIZED_STATEMENT_SCHEMA].copy()
-    final_citi.to_csv(CITI_NORMALIZED, index=False, encoding="utf-8-sig")
-    return raw_rows
\ No newline at end of file
+    return df_ras[NORMALIZED_STATEMENT_SCHEMA].copy(), date_report
+
+
+def stream_citi_statement(
+    output_path: Path,
+    chunksize: int,
+    keep_rows: bool = False,
+    date_format: Optional[str] = None
+) -> Tuple[int, Optional[pd.DataFrame], Dict[str, Any]]:
+    """
+    Normaliza SOURCE.raw_input por bloques de `chunksize` filas: filtro RAS, neteo débito/crédito y fechas
+    se aplican a cada bloque, que se anexa de inmediato a `output_path` (CSV o row groups columnares).
+    La memoria pico queda acotada por el tamaño del bloque (más la porción RAS acumulada si `keep_rows`,
+    usada como shard del manifiesto). El formato de fecha inferido en un bloque se reutiliza en los siguientes.
+    Devuelve (filas crudas, porción RAS normalizada o None, reporte de fechas acumulado).
+    """
+    raw_rows = 0
+    kept: List[pd.DataFrame] = []
+    date_totals = {"format": date_format, "rows": 0, "blank": 0, "fallback": 0, "coerced": 0}
+    with ArtifactWriter(output_path, NORMALIZED_STATEMENT_DTYPES) as writer:
+        for chunk in pd.read_csv(SOURCE.raw_input, chunksize=chunksize):
+            raw_rows += len(chunk)
+            normalized, date_report = normalize_citi_frame(chunk, date_format=date_totals["format"])
+            date_totals["format"] = date_report["format"] or date_totals["format"]
+            for key in ("rows", "blank", "fallback", "coerced"):
+                date_totals[key] += date_report[key]
+            if normalized.empty:
+                continue
+            writer.write(normalized)
+            if keep_rows:
+                kept.append(normalized)
+
+    if not keep_rows:
+        return raw_rows, None, date_totals
+    shard = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame(columns=NORMALIZED_STATEMENT_SCHEMA)
+    return raw_rows, shard, date_totals
+
+
+def run(
+    rules: RulesManager = None,
+    incremental: bool = INCREMENTAL_INGESTION,
+    chunksize: Optional[int] = CITI_STREAMING_CHUNKSIZE
+) -> Dict[str, int]:
+    """
+    Función de entrada llamada por run_pipeline.py.
+    En modo incremental, si el extracto no cambió desde la última corrida se reutiliza su shard normalizado.
+    Con `chunksize` el extracto se procesa en streaming con memoria acotada.
+    Devuelve las filas crudas leídas y las filas RAS descartadas por fecha NaT (también en caché).
+    """
+    fingerprint = payload_fingerprint({
+        "version": _SHARD_FORMAT_VERSION,
+        "column_mapping": SOURCE.column_mapping,
+        "company_filter": SOURCE.company_filter
+    })
+    manifest = IngestionManifest(SOURCE.name, fingerprint) if incremental else None
+
+    if not SOURCE.raw_input.exists():
+        if manifest is not None:
+            manifest.prune([])
+            manifest.save()
+        write_artifact(pd.DataFrame(columns=NORMALIZED_STATEMENT_SCHEMA), SOURCE.normalized_path, NORMALIZED_STATEMENT_DTYPES)
+        return {"raw_rows": 0, "date_coerced": 0}
+
+    cached = manifest.load_shard(SOURCE.raw_input) if manifest is not None else None
+    date_format = manifest.date_format if manifest is not None else None
+    date_report = None
+    if cached is not None:
+        print("♻️  CITI: extracto sin cambios reutilizado desde el manifiesto")
+        final_citi, raw_rows, date_coerced = cached
+        write_artifact(final_citi, SOURCE.normalized_path, NORMALIZED_STATEMENT_DTYPES)
+    elif chunksize:
+        raw_rows, final_citi, date_report = stream_citi_statement(
+            SOURCE.normalized_path, chunksize, keep_rows=manifest is not None, date_format=date_format
+        )
+        print(f"🌊 CITI: {raw_rows} filas procesadas en streaming (bloques de {chunksize})")
+        date_coerced = date_report["coerced"]
+    else:
+        df_raw = pd.read_csv(SOURCE.raw_input)
+        raw_rows = len(df_raw)
+        final_citi, date_report = normalize_citi_frame(df_raw, date_format=date_format)
+        write_artifact(final_citi, SOURCE.normalized_path, NORMALIZED_STATEMENT_DTYPES)
+        date_coerced = date_report["coerced"]
+
+    if date_coerced:
+        print(f"⚠️  CITI: {date_coerced} filas RAS descartadas por fecha no interpretable (NaT)")
+
+    if manifest is not None:
+        if date_report is not None:
+            manifest.store_shard(SOURCE.raw_input, final_citi, raw_rows=raw_rows, date_coerced=date_coerced)
+            manifest.date_format = date_report["format"] or date_format
+        manifest.prune([SOURCE.raw_input])
+        manifest.save()
+
+    return {"raw_rows": raw_rows, "date_coerced": date_coerced}
@@ -1,26 +1,20 @@
-import pandas as pd
 import sys
 import os
+from pathlib import Path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-from scripts.utils.text_cleaning import normalize_vendor as normalize
+from scripts.utils.excel_cache import read_excel_cached
+from scripts.utils.gl_tree import build_parent_codes
+from scripts.utils.text_cleaning import normalize_vendor_series
 
 # Load data
-df = pd.read_excel(r"data/raw/rentify_entity_dictionary.xlsx", sheet_name="gl_accounts")
-
-# Detect indentation and hierarchy
-def detect_parent(row_index, df):
-    current_indent = len(df.loc[row_index, 'gl_account']) - len(df.loc[row_index, 'gl_account'].lstrip())
-    for i in range(row_index - 1, -1, -1):
-        prev_indent = len(df.loc[i, 'gl_account']) - len(df.loc[i, 'gl_account'].lstrip())
-        if prev_indent < current_indent:
-            return df.loc[i, 'gl_account'].split(":")[0].strip()
-    return ""
+df = read_excel_cached(Path(r"data/raw/rentify_entity_dictionary.xlsx"), sheet_name="gl_accounts")
 
 # Create columns
 df['raw_name'] = df['gl_account'].apply(lambda x: x.split(":")[1].strip() if ":" in str(x) else str(x).strip())
 df['gl_code'] = df['gl_account'].apply(lambda x: x.split(":")[0].strip() if ":" in str(x) else "")
-df['normalized_name'] = df['raw_name'].apply(normalize)
-df['parent_code'] = [detect_parent(i, df) for i in range(len(df))]
+df['normalized_name'] = normalize_vendor_series(df['raw_name'])
+# Jerarquía por sangría en una sola pasada (pila)
+df['parent_code'] = build_parent_codes(df['gl_account'].tolist())
 
 #Combine gl_code con raw_name and normalize_name
 df['code_raw'] = df['gl_code'] + ": " + df['raw_name']
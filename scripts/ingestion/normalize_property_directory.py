@@ -15,6 +15,7 @@ if str(PROJECT_ROOT) not in sys.path:
 import re
 import pandas as pd
 from scripts.config import ENTITY_DICTIONARY, PROPERTY_DIRECTORY
+from scripts.utils.excel_cache import CachedExcelFile
 
 
 def normalize(text: object) -> str:
@@ -39,12 +40,12 @@ def run() -> int:
         print(f"⚠️ Archivo no encontrado: {ENTITY_DICTIONARY}")
         return 0
 
-    excel = pd.ExcelFile(ENTITY_DICTIONARY)
-    if "property_directory" not in excel.sheet_names:
-        print("⚠️ Hoja 'property_directory' no encontrada en el diccionario.")
-        return 0
+    with CachedExcelFile(ENTITY_DICTIONARY) as excel:
+        if "property_directory" not in excel.sheet_names:
+            print("⚠️ Hoja 'property_directory' no encontrada en el diccionario.")
+            return 0
 
-    df = pd.read_excel(excel, sheet_name="property_directory")
+        df = excel.parse("property_directory")
     col_prop = "property" if "property" in df.columns else df.columns[0]
 
     df["raw_property"] = df[col_prop].fillna("").astype(str).str.strip()
@@ -1,16 +1,17 @@
-import pandas as pd
 import sys
 import os
+from pathlib import Path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-from scripts.utils.text_cleaning import normalize_vendor as normalize
+from scripts.utils.excel_cache import read_excel_cached
+from scripts.utils.text_cleaning import normalize_vendor_series
 
 # Load data
-df = pd.read_excel(r"data/raw/rentify_entity_dictionary.xlsx", sheet_name="vendor_directory")
+df = read_excel_cached(Path(r"data/raw/rentify_entity_dictionary.xlsx"), sheet_name="vendor_directory")
 
 # Normalize text fields
 df['raw_name'] = df['name'].fillna("").astype(str).str.strip()
-df['normalized_name'] = df['raw_name'].apply(normalize)
-df['normalized_company'] = df['company_name'].fillna("").apply(normalize)
+df['normalized_name'] = normalize_vendor_series(df['raw_name'])
+df['normalized_company'] = normalize_vendor_series(df['company_name'].fillna(""))
 
 # Reorder columns
 df_final = df[['company_name', 'normalized_company', 'raw_name', 'normalized_name']]
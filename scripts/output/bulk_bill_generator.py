@@ -9,14 +9,13 @@ from typing import Dict, Any, Tuple
 import pandas as pd
 
 from scripts.config import (
-    AMEX_NETTED,
-    CITI_NETTED,
-    AMEX_BULK_BILL,
-    CITI_BULK_BILL,
     LOGS_DIR,
-    FINAL_APPFOLIO_COLUMNS
+    FINAL_APPFOLIO_COLUMNS,
+    NORMALIZED_STATEMENT_DTYPES,
+    STATEMENT_SOURCES
 )
 from scripts.rules_manager import RulesManager, normalize_text
+from scripts.utils.artifact_io import read_artifact, resolve_artifact_path
 
 
 def write_audit_log(df_errors: pd.DataFrame, log_filename: Path) -> None:
@@ -81,10 +80,10 @@ def process_card_dataset(
     rules: RulesManager, 
     audit_log: Path
 ) -> Tuple[int, int]:
-    if not input_file.exists():
+    if not resolve_artifact_path(input_file).exists():
         return 0, 0
 
-    df = pd.read_csv(input_file)
+    df = read_artifact(input_file, NORMALIZED_STATEMENT_DTYPES)
     if df.empty:
         pd.DataFrame(columns=FINAL_APPFOLIO_COLUMNS).to_csv(output_file, index=False, encoding="utf-8-sig")
         return 0, 0
@@ -92,9 +91,7 @@ def process_card_dataset(
     df.columns = df.columns.str.lower()
 
     # 1. Validaciones dinámicas (Alerts)
-    validation_results = df.apply(rules.evaluate_row_alerts, axis=1)
-    df["validation_status"] = [v[0] for v in validation_results]
-    df["validation_note"] = [v[1] for v in validation_results]
+    df["validation_status"], df["validation_note"] = rules.evaluate_alerts(df)
 
     errors = df[df["validation_status"] != "OK"].copy()
     if not errors.empty:
@@ -107,8 +104,8 @@ def process_card_dataset(
         return 0, len(errors)
 
     # 2. Resolución de Entidades
-    df_valid["resolved_vendor"] = df_valid["merchant"].apply(lambda m: rules.resolve_vendor(m)[0])
-    df_valid["resolved_property"] = df_valid["property_hint"].apply(lambda p: rules.resolve_property(p)[0])
+    df_valid["resolved_vendor"] = rules.resolve_vendors(df_valid["merchant"])["target"]
+    df_valid["resolved_property"] = rules.resolve_properties(df_valid["property_hint"])["target"]
     df_valid["abs_amount"] = df_valid["amount"].abs().round(2)
 
     # 3. Neteado de transacciones opuestas
@@ -125,14 +122,17 @@ def process_card_dataset(
     # 5. Ensamble Final con contrato estricto de AppFolio
     cash_account = rules.resolve_cash_account(card_key)
 
+    # Las fechas viajan tipadas entre etapas; el texto ISO solo se genera para el archivo de AppFolio
+    bill_dates = pd.to_datetime(df_netted["date"]).dt.strftime("%Y-%m-%d")
+
     final_df = pd.DataFrame({
         "Bill Property Code*": df_netted["resolved_property"],
         "Vendor Payee Name*": df_netted["resolved_vendor"],
         "Amount*": df_netted["amount"],
         "Bill Account*": df_netted["resolved_vendor"].apply(rules.resolve_gl),
-        "Bill Date*": df_netted["date"],
-        "Due Date*": df_netted["date"],
-        "Posting Date": df_netted["date"],
+        "Bill Date*": bill_dates,
+        "Due Date*": bill_dates,
+        "Posting Date": bill_dates,
         "Description": (
             card_key.upper() + " | " + 
             df_netted["merchant"].astype(str) + " | " + 
@@ -150,11 +150,11 @@ def run_generation(rules: RulesManager, run_id: str) -> Dict[str, Any]:
     """Punto de entrada para run_pipeline.py."""
     audit_file = LOGS_DIR / f"audit_log_{datetime.now().strftime('%Y-%m')}.csv"
 
-    amex_bills, amex_warnings = process_card_dataset("amex", AMEX_NETTED, AMEX_BULK_BILL, rules, audit_file)
-    citi_bills, citi_warnings = process_card_dataset("mastercard", CITI_NETTED, CITI_BULK_BILL, rules, audit_file)
-
-    return {
-        "amex_bills": amex_bills,
-        "citi_bills": citi_bills,
-        "warnings": amex_warnings + citi_warnings
-    }
\ No newline at end of file
+    metrics: Dict[str, Any] = {"warnings": 0}
+    for source in STATEMENT_SOURCES.values():
+        bills, warnings = process_card_dataset(
+            source.card_key, source.netted_path, source.bulk_bill_path, rules, audit_file
+        )
+        metrics[f"{source.name}_bills"] = bills
+        metrics["warnings"] += warnings
+    return metrics
\ No newline at end of file
@@ -1,108 +1,285 @@
 """
 scripts/reconciliation/dedup_appfolio.py
 Conciliación y deduplicación contra el libro mayor (vendor_ledger.csv) de AppFolio.
+Cada par (tarjeta, proveedor) es un bloque independiente: lee el ledger sin consumir facturas ajenas
+y solo consume cargos propios, por lo que los bloques se concilian en paralelo y se fusionan por unión.
 """
 
-import re
+import os
+import numpy as np
 import pandas as pd
-from typing import Dict, Any, Set
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
 from scripts.config import (
+    DEDUP_WORKERS,
+    DEDUP_DATE_WINDOW_DAYS,
+    DEDUP_SPLIT_MAX_CHARGES,
+    DEDUP_SPLIT_SEARCH_BUDGET,
+    DEDUP_SPLIT_WINDOW_DAYS,
+    LEDGER_BILL_DATE_COLUMN,
     VENDOR_LEDGER,
-    AMEX_NORMALIZED,
-    CITI_NORMALIZED,
-    AMEX_NETTED,
-    CITI_NETTED,
+    NORMALIZED_STATEMENT_DTYPES,
+    STATEMENT_SOURCES,
     UNMATCHED_LEDGER_REPORT
 )
+from scripts.reconciliation.ledger_index import LedgerTokenIndex, clean_tokens, ordered_tokens
+from scripts.reconciliation.matching import CardAmountIndex, build_logical_invoices
 from scripts.rules_manager import RulesManager
+from scripts.utils.artifact_io import read_artifact, resolve_artifact_path, write_artifact
+from scripts.utils.currency import parse_currency
+from scripts.utils.dates import parse_dates
+from scripts.utils.unique_values import UniqueValues
 
 AMOUNT_TOLERANCE = 0.01
+AMOUNT_TOLERANCE_CENTS = int(round(AMOUNT_TOLERANCE * 100))
+SPLIT_METRICS = ("split_matches", "split_charges", "split_search_nodes", "split_budget_exhausted")
+
+
+_MIN_PARTITIONS_PER_WORKER = 8
+
+# Columnas que viajan a los bloques (lo mínimo para emparejar)
+_CARD_BLOCK_COLUMNS = ["date", "amount"]
+_BILL_BLOCK_COLUMNS = ["unpaid_clean", "reference", "bill_date"]
+
+
+class VendorPartition(NamedTuple):
+    """Bloque (tarjeta, proveedor) como posiciones: el ledger y los extractos se envían una vez por worker."""
+    source: str
+    vendor_key: str
+    card_positions: np.ndarray
+    bill_positions: np.ndarray
+
+
+class PartitionResult(NamedTuple):
+    source: str
+    removed: List[Hashable]
+    matched_bills: List[Hashable]
+    split_stats: Dict[str, int]
+
+
+class CardVendorBlocks:
+    """Filas de un extracto por token de proveedor; el contains se evalúa sobre nombres distintos."""
+
+    def __init__(self, card_df: pd.DataFrame):
+        self.card_df = card_df
+        self._vendors = UniqueValues(card_df["vendor_resolved"].str.upper())
+        self._names = [str(u) for u in self._vendors.uniques]
+
+    def positions_for(self, token: str) -> np.ndarray:
+        return np.flatnonzero(self._vendors.expand([token in name for name in self._names], False, bool))
+
+    def rows_for(self, token: str) -> pd.DataFrame:
+        return self.card_df.iloc[self.positions_for(token)]
+
+
+def select_vendor_positions(
+    card_blocks: CardVendorBlocks,
+    vendor_key: str,
+    ledger_index: LedgerTokenIndex
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Bloque de un proveedor como (posiciones de cargos, posiciones del ledger): facturas que comparten algún
+    token (índice invertido) y cargos cuyo proveedor contiene su primer token en orden de aparición.
+    None si alguno de los lados está vacío.
+    """
+    tokens = ordered_tokens(vendor_key)
+    if not tokens:
+        return None
+
+    bill_positions = ledger_index.candidate_positions(tokens)
+    if not len(bill_positions):
+        return None
+
+    card_positions = card_blocks.positions_for(tokens[0])
+    if not len(card_positions):
+        return None
+    return card_positions, bill_positions
+
+
+def select_vendor_block(
+    card_blocks: CardVendorBlocks,
+    ledger_df: pd.DataFrame,
+    vendor_key: str,
+    ledger_index: LedgerTokenIndex
+) -> Optional[Tuple[pd.DataFrame, pd.DataFrame]]:
+    """select_vendor_positions materializado como (cargos, facturas candidatas)."""
+    if len(ledger_df) != len(ledger_index):
+        raise ValueError("El índice de tokens no corresponde al ledger recibido (tamaño distinto).")
+    positions = select_vendor_positions(card_blocks, vendor_key, ledger_index)
+    if positions is None:
+        return None
+    card_positions, bill_positions = positions
+    return card_blocks.card_df.iloc[card_positions], ledger_df.iloc[bill_positions]
+
+
+def match_vendor_block(
+    card_vendor: pd.DataFrame,
+    bills: pd.DataFrame,
+    date_window_days: Optional[int] = DEDUP_DATE_WINDOW_DAYS,
+    split_max_charges: int = DEDUP_SPLIT_MAX_CHARGES,
+    split_budget: int = DEDUP_SPLIT_SEARCH_BUDGET,
+    split_window_days: Optional[int] = DEDUP_SPLIT_WINDOW_DAYS,
+    split_stats: Optional[Dict[str, int]] = None
+) -> Tuple[Set[Hashable], List[Hashable]]:
+    """
+    Empareja facturas lógicas y cargos de un bloque. Devuelve (cargos duplicados, etiquetas de ledger conciliadas).
+    1ª pasada: un cargo por factura lógica. 2ª pasada: facturas restantes pagadas con 2..split_max_charges
+    cargos; sus contadores se acumulan en `split_stats` si se proporciona.
+    """
+    to_remove: Set[Hashable] = set()
+
+    # Emparejamiento voraz en centavos: cada factura lógica consume el cargo más antiguo dentro de
+    # tolerancia y de la ventana de fechas (bloques proveedor + mes)
+    card_index = CardAmountIndex(
+        card_vendor,
+        tolerance_cents=AMOUNT_TOLERANCE_CENTS,
+        date_window_days=date_window_days,
+        split_window_days=split_window_days if split_max_charges >= 2 else None
+    )
+    matched_labels: List[Hashable] = []
+    pending = []
+    for invoice in build_logical_invoices(bills):
+        match_idx = card_index.take(invoice.amount_cents, invoice.bill_day)
+        if match_idx is not None:
+            to_remove.add(match_idx)
+            matched_labels.extend(invoice.ledger_labels)
+        else:
+            pending.append(invoice)
+
+    # Segunda pasada: facturas pagadas con varios cargos (subset-sum acotado por bloque y presupuesto)
+    if split_max_charges >= 2:
+        for invoice in pending:
+            if invoice.amount_cents < 2:
+                continue
+            split = card_index.take_split(invoice.amount_cents, invoice.bill_day, split_max_charges, split_budget)
+            if split_stats is not None:
+                split_stats["split_search_nodes"] += split.nodes
+                split_stats["split_budget_exhausted"] += int(split.exhausted)
+            if split.labels:
+                to_remove.update(split.labels)
+                matched_labels.extend(invoice.ledger_labels)
+                if split_stats is not None:
+                    split_stats["split_matches"] += 1
+                    split_stats["split_charges"] += len(split.labels)
+
+    return to_remove, matched_labels
+
+
+def deduplicate_card_against_ledger(
+    card_df: pd.DataFrame,
+    ledger_df: pd.DataFrame,
+    vendor_key: str,
+    ledger_index: Optional[LedgerTokenIndex] = None,
+    date_window_days: Optional[int] = DEDUP_DATE_WINDOW_DAYS,
+    split_max_charges: int = DEDUP_SPLIT_MAX_CHARGES,
+    split_budget: int = DEDUP_SPLIT_SEARCH_BUDGET,
+    split_window_days: Optional[int] = DEDUP_SPLIT_WINDOW_DAYS,
+    split_stats: Optional[Dict[str, int]] = None
+) -> Set[int]:
+    """
+    Cargos de `card_df` que duplican facturas vivas del ledger para `vendor_key` (marca matched_to_card).
+    Variante secuencial de un único bloque; run() concilia todos los bloques con reconcile_partitions.
+    """
+    if ledger_index is None:
+        ledger_index = LedgerTokenIndex(ledger_df)
+    block = select_vendor_block(CardVendorBlocks(card_df), ledger_df, vendor_key, ledger_index)
+    if block is None:
+        return set()
 
+    to_remove, matched_labels = match_vendor_block(
+        *block,
+        date_window_days=date_window_days,
+        split_max_charges=split_max_charges,
+        split_budget=split_budget,
+        split_window_days=split_window_days,
+        split_stats=split_stats
+    )
+    if matched_labels:
+        ledger_df.loc[matched_labels, "matched_to_card"] = True
+    return to_remove
 
-def clean_tokens(text: object) -> Set[str]:
-    if pd.isna(text):
-        return set()
-    clean = re.sub(r"[^\w\s]", " ", str(text).upper())
-    tokens = set(clean.split())
-    noise = {"THE", "INC", "CORP", "LLC", "CO", "AND", "DE", "LA", "LAS", "LOS", "SERVICES", "GROUP"}
-    return tokens - noise
-
-
-def safe_clean_currency(series: pd.Series) -> pd.Series:
-    return (
-        pd.to_numeric(
-            series.astype(str).replace(r"[^\d\.-]", "", regex=True),
-            errors="coerce"
-        ).fillna(0.0).round(2)
+
+def iter_partitions(
+    card_blocks: Dict[str, CardVendorBlocks],
+    ledger_index: LedgerTokenIndex
+) -> Iterator[VendorPartition]:
+    """Bloques (tarjeta, proveedor resuelto) en orden de registro y de aparición, generados bajo demanda."""
+    for source, blocks in card_blocks.items():
+        for v_key in blocks.card_df["vendor_resolved"].dropna().unique():
+            positions = select_vendor_positions(blocks, v_key, ledger_index)
+            if positions is not None:
+                yield VendorPartition(source, v_key, *positions)
+
+
+def _reconcile_partition_frames(
+    partition: VendorPartition,
+    bills: pd.DataFrame,
+    card_frames: Dict[str, pd.DataFrame]
+) -> PartitionResult:
+    """Concilia un bloque tomando sus filas de los frames compartidos."""
+    split_stats = dict.fromkeys(SPLIT_METRICS, 0)
+    removed, matched = match_vendor_block(
+        card_frames[partition.source].iloc[partition.card_positions],
+        bills.iloc[partition.bill_positions],
+        split_stats=split_stats
     )
+    return PartitionResult(partition.source, sorted(removed), matched, split_stats)
 
 
-def deduplicate_card_against_ledger(card_df: pd.DataFrame, ledger_df: pd.DataFrame, vendor_key: str) -> Set[int]:
-    to_remove = set()
-    card_tokens = clean_tokens(vendor_key)
-    if not card_tokens:
-        return to_remove
+# Frames compartidos de cada worker del pool (cargados una sola vez por el initializer)
+_WORKER_BILLS: Optional[pd.DataFrame] = None
+_WORKER_CARDS: Dict[str, pd.DataFrame] = {}
 
-    def is_vendor_match(row):
-        ledger_v_tokens = clean_tokens(row["vendor"])
-        ledger_d_tokens = clean_tokens(row["desc_clean"])
-        return bool(card_tokens.intersection(ledger_v_tokens | ledger_d_tokens))
 
-    bills = ledger_df[ledger_df.apply(is_vendor_match, axis=1)].copy()
-    if bills.empty:
-        return to_remove
+def _init_worker(bills: pd.DataFrame, card_frames: Dict[str, pd.DataFrame]) -> None:
+    global _WORKER_BILLS, _WORKER_CARDS
+    _WORKER_BILLS, _WORKER_CARDS = bills, card_frames
 
-    first_token = list(card_tokens)[0]
-    card_vendor = card_df[card_df["vendor_resolved"].str.upper().str.contains(first_token, na=False, regex=False)].copy()
-    if card_vendor.empty:
-        return to_remove
 
-    bills["reference_clean"] = bills["reference"].astype(str).str.strip()
-    valid_ref_mask = (
-        (bills["reference_clean"].str.len() > 1) & 
-        (~bills["reference_clean"].str.lower().isin(["nan", "0", "00", "none", "null", ""]))
-    )
+def _reconcile_partition(partition: VendorPartition) -> PartitionResult:
+    """Concilia un bloque dentro de un worker (función de módulo: serializable para el pool)."""
+    return _reconcile_partition_frames(partition, _WORKER_BILLS, _WORKER_CARDS)
 
-    referenced_bills = bills[valid_ref_mask].copy()
-    unreferenced_bills = bills[~valid_ref_mask].copy()
-
-    logical_invoices = []
-    if not referenced_bills.empty:
-        for ref, group in referenced_bills.groupby("reference_clean"):
-            logical_invoices.append({
-                "amount": abs(group["unpaid_clean"].sum()),
-                "original_indices": group.index.tolist()
-            })
-
-    for idx, row in unreferenced_bills.iterrows():
-        logical_invoices.append({
-            "amount": abs(row["unpaid_clean"]),
-            "original_indices": [idx]
-        })
-
-    for inv in logical_invoices:
-        inv_amount = inv["amount"]
-        matches = card_vendor[
-            (~card_vendor.index.isin(to_remove)) & 
-            (abs(card_vendor["amount"].abs() - inv_amount) <= AMOUNT_TOLERANCE)
-        ].sort_values("date")
-
-        if not matches.empty:
-            match_idx = matches.index[0]
-            to_remove.add(match_idx)
-            ledger_df.loc[inv["original_indices"], "matched_to_card"] = True
 
-    return to_remove
+def resolve_dedup_workers(workers: Optional[int], max_partitions: int) -> int:
+    """Procesos efectivos: None = os.cpu_count(), con al menos _MIN_PARTITIONS_PER_WORKER bloques por proceso."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    # Pocos bloques no compensan el arranque del pool
+    return max(1, min(workers, max_partitions // _MIN_PARTITIONS_PER_WORKER))
+
+
+def reconcile_partitions(
+    partitions: Iterable[VendorPartition],
+    bills: pd.DataFrame,
+    card_frames: Dict[str, pd.DataFrame],
+    workers: int = 1
+) -> Iterator[PartitionResult]:
+    """
+    Concilia los bloques en el orden de `partitions`. Con un solo proceso se consumen de uno en uno
+    (solo un bloque materializado a la vez); con varios, cada worker recibe `bills` y `card_frames`
+    una única vez vía initializer y por bloque solo viajan posiciones. pool.map preserva el orden y los
+    bloques no comparten estado mutable, así que la fusión es idéntica a la ejecución secuencial.
+    """
+    if workers <= 1:
+        return (_reconcile_partition_frames(partition, bills, card_frames) for partition in partitions)
+
+    partitions = list(partitions)
+    # Lotes de bloques por tarea: muchos proveedores pequeños no deben pagar un viaje IPC cada uno
+    chunksize = max(1, len(partitions) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(bills, card_frames)) as pool:
+        return iter(list(pool.map(_reconcile_partition, partitions, chunksize=chunksize)))
 
 
-def run(rules: RulesManager) -> Dict[str, Any]:
+def run(rules: RulesManager, workers: Optional[int] = DEDUP_WORKERS) -> Dict[str, Any]:
     """Función de entrada llamada por run_pipeline.py."""
     if not VENDOR_LEDGER.exists():
         # Si no hay ledger, transferir directamente normalizados a neteados
-        for src, dst in [(AMEX_NORMALIZED, AMEX_NETTED), (CITI_NORMALIZED, CITI_NETTED)]:
-            if src.exists():
-                pd.read_csv(src).to_csv(dst, index=False, encoding="utf-8-sig")
-        return {"amex_duplicates": 0, "citi_duplicates": 0}
+        for source in STATEMENT_SOURCES.values():
+            if resolve_artifact_path(source.normalized_path).exists():
+                normalized = read_artifact(source.normalized_path, NORMALIZED_STATEMENT_DTYPES)
+                write_artifact(normalized, source.netted_path, NORMALIZED_STATEMENT_DTYPES)
+        return {f"{name}_duplicates": 0 for name in STATEMENT_SOURCES}
 
     ledger = pd.read_csv(VENDOR_LEDGER)
     ledger.columns = ledger.columns.str.strip().str.lower()
@@ -115,48 +292,78 @@ def run(rules: RulesManager) -> Dict[str, Any]:
 
     ledger["vendor"] = ledger.get("vendor", ledger.get("description", "")).astype(str).str.strip()
     ledger["desc_clean"] = ledger.get("description", "").astype(str).str.upper()
-    ledger["unpaid_clean"] = safe_clean_currency(ledger.get("unpaid", pd.Series(0, index=ledger.index)))
+    ledger["unpaid_clean"] = parse_currency(ledger.get("unpaid", pd.Series(0, index=ledger.index)))
     ledger["reference"] = ledger.get("reference", "")
+    # Fecha de factura para la ventana de emparejamiento: "bill date" explícita antes que cualquier otra
+    # columna con "date" ("due date" o "paid date" desplazarían la ventana y perderían duplicados reales)
+    if LEDGER_BILL_DATE_COLUMN in ledger.columns:
+        date_col = LEDGER_BILL_DATE_COLUMN
+    else:
+        date_col = next((col for col in ledger.columns if "date" in col), None)
+    if date_col is not None:
+        ledger["bill_date"], _ = parse_dates(ledger[date_col])
+    else:
+        ledger["bill_date"] = pd.NaT
     
     # Filtrar deuda viva
     ledger = ledger[ledger["unpaid_clean"] > 0].copy()
     ledger["matched_to_card"] = False
+    # Tokenización única del ledger compartida por todos los proveedores y tarjetas
+    ledger_index = LedgerTokenIndex(ledger)
 
-    jobs = [
-        ("amex", AMEX_NORMALIZED, AMEX_NETTED),
-        ("citi", CITI_NORMALIZED, CITI_NETTED)
-    ]
+    jobs = [(source.name, source.normalized_path, source.netted_path) for source in STATEMENT_SOURCES.values()]
 
     metrics = {}
+    cards: Dict[str, Tuple[pd.DataFrame, Any]] = {}
+    card_blocks: Dict[str, CardVendorBlocks] = {}
 
+    # 1. Extractos con proveedor resuelto; los bloques (tarjeta, proveedor) se generan al conciliar
     for label, in_path, out_path in jobs:
-        if not in_path.exists():
+        if not resolve_artifact_path(in_path).exists():
             continue
 
-        card = pd.read_csv(in_path)
+        card = read_artifact(in_path, NORMALIZED_STATEMENT_DTYPES)
         if card.empty:
-            card.to_csv(out_path, index=False, encoding="utf-8-sig")
+            write_artifact(card, out_path, NORMALIZED_STATEMENT_DTYPES)
             metrics[f"{label}_duplicates"] = 0
             continue
 
         # Resolver proveedor temporalmente con RulesManager para el cruce
-        card["vendor_resolved"] = card["merchant"].apply(lambda m: rules.resolve_vendor(m)[0])
-
-        unique_vendors = card["vendor_resolved"].dropna().unique()
-        all_to_remove = set()
-
-        for v_key in unique_vendors:
-            dups = deduplicate_card_against_ledger(card, ledger, v_key)
-            all_to_remove.update(dups)
-
+        card["vendor_resolved"] = rules.resolve_vendors(card["merchant"])["target"]
+        cards[label] = (card, out_path)
+        card_blocks[label] = CardVendorBlocks(card)
+
+    # 2. Conciliación de bloques (secuencial o en pool) y fusión determinística por unión
+    max_partitions = sum(card["vendor_resolved"].nunique() for card, _ in cards.values())
+    workers = resolve_dedup_workers(workers, max_partitions)
+    card_frames = {label: card[_CARD_BLOCK_COLUMNS] for label, (card, _) in cards.items()}
+
+    removed: Dict[str, Set[Hashable]] = {label: set() for label in cards}
+    split_totals = {label: dict.fromkeys(SPLIT_METRICS, 0) for label in cards}
+    matched_bills: Set[Hashable] = set()
+    results = reconcile_partitions(
+        iter_partitions(card_blocks, ledger_index), ledger[_BILL_BLOCK_COLUMNS], card_frames, workers
+    )
+    for result in results:
+        removed[result.source].update(result.removed)
+        matched_bills.update(result.matched_bills)
+        for key, value in result.split_stats.items():
+            split_totals[result.source][key] += value
+
+    if matched_bills:
+        ledger.loc[sorted(matched_bills), "matched_to_card"] = True
+
+    # 3. Guardar datasets netos libres de duplicados
+    for label, (card, out_path) in cards.items():
+        all_to_remove = removed[label]
         metrics[f"{label}_duplicates"] = len(all_to_remove)
+        metrics.update({f"{label}_{key}": value for key, value in split_totals[label].items()})
 
-        # Guardar dataset neto libre de duplicados
         net_df = card[~card.index.isin(all_to_remove)].drop(columns=["vendor_resolved"]).reset_index(drop=True)
-        net_df.to_csv(out_path, index=False, encoding="utf-8-sig")
+        write_artifact(net_df, out_path, NORMALIZED_STATEMENT_DTYPES)
 
     # Guardar reporte de facturas no encontradas en AppFolio
-    unmatched = ledger[~ledger["matched_to_card"]].drop(columns=["desc_clean", "unpaid_clean", "matched_to_card"], errors="ignore")
+    unmatched = ledger[~ledger["matched_to_card"]].drop(columns=["desc_clean", "unpaid_clean", "bill_date", "matched_to_card"], errors="ignore")
     unmatched.to_csv(UNMATCHED_LEDGER_REPORT, index=False, encoding="utf-8-sig")
 
-    return metrics
\ No newline at end of file
+    return metrics
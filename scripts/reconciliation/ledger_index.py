@@ -0,0 +1,72 @@
+"""
+scripts/reconciliation/ledger_index.py
+Índice invertido token -> filas del ledger de AppFolio.
+El ledger se tokeniza una sola vez por ejecución (vendor + descripción) y las facturas candidatas
+de cada proveedor se obtienen con búsquedas en diccionario en lugar de re-tokenizar todo el ledger.
+"""
+
+import re
+from typing import Dict, FrozenSet, Iterable, List, Set
+
+import numpy as np
+import pandas as pd
+
+from scripts.utils.unique_values import map_unique
+
+NOISE_TOKENS: FrozenSet[str] = frozenset(
+    {"THE", "INC", "CORP", "LLC", "CO", "AND", "DE", "LA", "LAS", "LOS", "SERVICES", "GROUP"}
+)
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+def ordered_tokens(text: object) -> List[str]:
+    """Tokens significativos en orden de aparición (sin repetidos ni ruido)."""
+    if pd.isna(text):
+        return []
+    clean = _NON_WORD.sub(" ", str(text).upper())
+    return [token for token in dict.fromkeys(clean.split()) if token not in NOISE_TOKENS]
+
+
+def clean_tokens(text: object) -> Set[str]:
+    return set(ordered_tokens(text))
+
+
+def tokenize_series(values: pd.Series) -> List[FrozenSet[str]]:
+    """clean_tokens por fila (nulos -> conjunto vacío)."""
+    return map_unique(values, lambda value: frozenset(clean_tokens(value)), frozenset()).tolist()
+
+
+class LedgerTokenIndex:
+    """
+    Listas de posiciones (orden del ledger) por token de `vendor` o `desc_clean`.
+    Las posiciones son relativas al DataFrame indexado, que no debe filtrarse ni reordenarse después.
+    """
+
+    def __init__(self, ledger_df: pd.DataFrame):
+        self.size = len(ledger_df)
+        postings: Dict[str, List[int]] = {}
+        rows = zip(tokenize_series(ledger_df["vendor"]), tokenize_series(ledger_df["desc_clean"]))
+        for pos, (vendor_tokens, desc_tokens) in enumerate(rows):
+            for token in vendor_tokens | desc_tokens:
+                postings.setdefault(token, []).append(pos)
+        self.postings: Dict[str, np.ndarray] = {
+            token: np.asarray(positions, dtype=np.int64) for token, positions in postings.items()
+        }
+
+    def __len__(self) -> int:
+        return self.size
+
+    def candidate_positions(self, tokens: Iterable[str]) -> np.ndarray:
+        """Posiciones (ordenadas) de las filas que comparten al menos un token."""
+        hits = [self.postings[token] for token in tokens if token in self.postings]
+        if not hits:
+            return np.empty(0, dtype=np.int64)
+        if len(hits) == 1:
+            return hits[0]
+        return np.unique(np.concatenate(hits))
+
+    def candidates(self, ledger_df: pd.DataFrame, tokens: Iterable[str]) -> pd.DataFrame:
+        """Equivalente a filtrar `ledger_df` por intersección de tokens, preservando el orden del ledger."""
+        if len(ledger_df) != self.size:
+            raise ValueError("El índice de tokens no corresponde al ledger recibido (tamaño distinto).")
+        return ledger_df.iloc[self.candidate_positions(tokens)]
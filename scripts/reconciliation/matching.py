@@ -0,0 +1,320 @@
+"""
+scripts/reconciliation/matching.py
+Motor de emparejamiento factura lógica -> cargo de tarjeta en centavos enteros.
+Las facturas lógicas (agrupadas por referencia) se construyen en una sola pasada y los cargos se
+indexan por (mes, importe): cada factura localiza por búsqueda binaria su cargo no consumido más
+antiguo dentro de la tolerancia y de la ventana de fechas, en lugar de re-filtrar y re-ordenar
+todos los cargos del proveedor.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from scripts.utils.currency import parse_currency_cents
+from scripts.utils.dates import parse_dates
+
+# Día epoch de una fecha ausente (NaT) y bloque temporal de los cargos sin fecha
+NO_DAY = np.iinfo(np.int64).min
+_UNDATED = -(2 ** 62)
+
+# Referencias que AppFolio deja vacías o con relleno: esas facturas se tratan de forma individual
+_NULL_REFERENCES = ["nan", "0", "00", "none", "null", ""]
+
+
+class LogicalInvoice(NamedTuple):
+    amount_cents: int
+    ledger_labels: List[Hashable]
+    bill_day: int = NO_DAY
+
+
+def build_logical_invoices(bills: pd.DataFrame) -> List[LogicalInvoice]:
+    """
+    Facturas lógicas: una por referencia válida (suma de sus filas, referencias en orden ascendente)
+    seguidas de una por cada fila sin referencia (orden del ledger). Importes en valor absoluto.
+    La fecha de la factura (`bill_date`, si existe) es la más antigua de sus filas.
+    """
+    if bills.empty:
+        return []
+
+    cents = parse_currency_cents(bills["unpaid_clean"])
+    references = bills["reference"].astype(str).str.strip()
+    valid = ((references.str.len() > 1) & (~references.str.lower().isin(_NULL_REFERENCES))).to_numpy()
+    labels = bills.index.to_numpy()
+    days = epoch_days(bills["bill_date"]) if "bill_date" in bills.columns else np.full(len(bills), NO_DAY)
+
+    invoices: List[LogicalInvoice] = []
+    if valid.any():
+        codes, uniques = pd.factorize(references[valid], sort=True)
+        totals = np.bincount(codes, weights=cents[valid], minlength=len(uniques))
+        members: List[List[Hashable]] = [[] for _ in range(len(uniques))]
+        first_day = np.full(len(uniques), NO_DAY, dtype=np.int64)
+        for code, label, day in zip(codes, labels[valid], days[valid]):
+            members[code].append(label)
+            if day != NO_DAY and (first_day[code] == NO_DAY or day < first_day[code]):
+                first_day[code] = day
+        invoices.extend(
+            LogicalInvoice(abs(int(total)), group, int(day))
+            for total, group, day in zip(totals, members, first_day)
+        )
+
+    invoices.extend(
+        LogicalInvoice(abs(int(amount)), [label], int(day))
+        for amount, label, day in zip(cents[~valid], labels[~valid], days[~valid])
+    )
+    return invoices
+
+
+def date_order(dates: pd.Series) -> np.ndarray:
+    """Rango cronológico de cada fila (empates en orden de aparición, fechas nulas al final)."""
+    order = np.argsort(
+        dates.reset_index(drop=True).sort_values(kind="stable", na_position="last").index.to_numpy(),
+        kind="stable"
+    )
+    return order.astype(np.int64)
+
+
+def epoch_days(dates: pd.Series) -> np.ndarray:
+    """Días desde 1970-01-01 (int64) para fechas de extracto o ledger; nulas o no interpretables -> NO_DAY."""
+    if not pd.api.types.is_datetime64_any_dtype(dates.dtype):
+        dates, _ = parse_dates(dates)
+    values = dates.to_numpy(dtype="datetime64[ns]")
+    days = values.astype("datetime64[D]").astype(np.int64)
+    days[np.isnat(values)] = NO_DAY
+    return days
+
+
+def month_bucket(day: int) -> int:
+    """Mes absoluto (meses desde 1970-01) de un día epoch."""
+    return int(np.datetime64(day, "D").astype("datetime64[M]").astype(np.int64))
+
+
+class _ChargeBlock:
+    """
+    Cargos de un mismo bloque (mes, |importe|) ordenados por (fecha, orden).
+    Un DSU "siguiente no consumido" salta en tiempo casi constante los cargos ya emparejados.
+    """
+
+    __slots__ = ("ranks", "days", "labels", "_next")
+
+    def __init__(self, entries: List[tuple]):
+        entries.sort(key=lambda entry: entry[0])
+        self.ranks = [entry[0] for entry in entries]
+        self.days = [entry[1] for entry in entries]
+        self.labels = [entry[2] for entry in entries]
+        self._next = list(range(len(entries) + 1))
+
+    def find(self, pos: int) -> int:
+        """Primera posición >= pos sin consumir (len(block) si no queda ninguna)."""
+        root = pos
+        while self._next[root] != root:
+            root = self._next[root]
+        while self._next[pos] != root:
+            self._next[pos], pos = root, self._next[pos]
+        return root
+
+    def consume(self, pos: int) -> None:
+        self._next[pos] = pos + 1
+
+    def first_available(self, min_day: Optional[int], max_day: Optional[int]) -> int:
+        """Posición del cargo más antiguo no consumido con fecha en [min_day, max_day]; -1 si no hay."""
+        start = 0 if min_day is None else bisect_left(self.days, min_day)
+        pos = self.find(start)
+        if pos >= len(self.ranks) or (max_day is not None and self.days[pos] > max_day):
+            return -1
+        return pos
+
+
+class CardAmountIndex:
+    """
+    Cargos de un proveedor bloqueados por (mes, |importe| en centavos).
+    take() consume el cargo más antiguo cuyo importe está a <= tolerance_cents de la factura y,
+    con `date_window_days`, cuya fecha dista como máximo esa ventana de la fecha de la factura.
+    Sin ventana todos los cargos comparten un único bloque temporal. Los cargos sin fecha forman su
+    propio bloque, siempre elegible y ordenado detrás de los fechados; igual ocurre con las facturas sin fecha.
+    """
+
+    def __init__(
+        self,
+        card_vendor: pd.DataFrame,
+        tolerance_cents: int,
+        date_window_days: Optional[int] = None,
+        split_window_days: Optional[int] = None
+    ):
+        self.tolerance_cents = tolerance_cents
+        self.date_window_days = date_window_days
+        self.split_window_days = split_window_days
+        amounts = card_vendor["amount"].to_numpy(dtype=np.float64)
+        cents = np.abs(parse_currency_cents(card_vendor["amount"]))
+        ranks = date_order(card_vendor["date"])
+        labels = card_vendor.index.to_numpy()
+        if date_window_days is None and split_window_days is None:
+            days = np.full(len(card_vendor), NO_DAY, dtype=np.int64)
+        else:
+            days = epoch_days(card_vendor["date"])
+        if date_window_days is not None:
+            # Con ventana el orden es cronológico sobre la fecha interpretada (sin fecha al final)
+            chronological = np.lexsort((ranks, np.where(days == NO_DAY, np.iinfo(np.int64).max, days)))
+            ranks = np.empty_like(ranks)
+            ranks[chronological] = np.arange(len(ranks))
+
+        grouped: Dict[int, Dict[int, List[tuple]]] = {}
+        for pos in np.flatnonzero(np.isfinite(amounts)):
+            day = int(days[pos])
+            if date_window_days is None:
+                month = 0
+            else:
+                month = _UNDATED if day == NO_DAY else month_bucket(day)
+            grouped.setdefault(month, {}).setdefault(int(cents[pos]), []).append((int(ranks[pos]), day, labels[pos]))
+
+        self._months: List[int] = sorted(m for m in grouped if m != _UNDATED)
+        self._amounts: Dict[int, List[int]] = {m: sorted(blocks) for m, blocks in grouped.items()}
+        self._blocks: Dict[int, Dict[int, _ChargeBlock]] = {
+            m: {amount: _ChargeBlock(entries) for amount, entries in blocks.items()}
+            for m, blocks in grouped.items()
+        }
+
+    def _candidate_months(self, bill_day: Optional[int], window_days: Optional[int] = None) -> List[int]:
+        window_days = self.date_window_days if window_days is None else window_days
+        if self.date_window_days is None:
+            return self._months
+        if bill_day is None or bill_day == NO_DAY:
+            return self._months + [_UNDATED]
+        lo = bisect_left(self._months, month_bucket(bill_day - window_days))
+        hi = bisect_right(self._months, month_bucket(bill_day + window_days))
+        return self._months[lo:hi] + [_UNDATED]
+
+    def _day_range(self, bill_day: Optional[int]) -> Tuple[Optional[int], Optional[int]]:
+        if self.date_window_days is None or bill_day is None or bill_day == NO_DAY:
+            return None, None
+        return bill_day - self.date_window_days, bill_day + self.date_window_days
+
+    def take(self, amount_cents: int, bill_day: Optional[int] = None) -> Optional[Hashable]:
+        min_day, max_day = self._day_range(bill_day)
+
+        best_block, best_pos, best_rank = None, -1, None
+        for month in self._candidate_months(bill_day):
+            amounts = self._amounts.get(month)
+            if not amounts:
+                continue
+            lo = bisect_left(amounts, amount_cents - self.tolerance_cents)
+            hi = bisect_right(amounts, amount_cents + self.tolerance_cents)
+            for amount in amounts[lo:hi]:
+                block = self._blocks[month][amount]
+                undated = month == _UNDATED
+                pos = block.first_available(None if undated else min_day, None if undated else max_day)
+                if pos >= 0 and (best_rank is None or block.ranks[pos] < best_rank):
+                    best_block, best_pos, best_rank = block, pos, block.ranks[pos]
+
+        if best_block is None:
+            return None
+        best_block.consume(best_pos)
+        return best_block.labels[best_pos]
+
+    def take_split(self, amount_cents: int, bill_day: Optional[int], max_charges: int, budget: int) -> "SplitMatch":
+        """
+        Pago fraccionado: 2..max_charges cargos no consumidos (mismo proveedor, dentro de la ventana)
+        cuya suma está a <= tolerance_cents de la factura. Prefiere menos cargos y, a igual tamaño, la
+        combinación más antigua. `budget` acota los nodos visitados (enumeración incluida).
+        Con `split_window_days` solo participan factura y cargos fechados dentro de esa ventana (más estrecha).
+        """
+        min_day, max_day = self._day_range(bill_day)
+        window_days = None
+        if self.split_window_days is not None:
+            if bill_day is None or bill_day == NO_DAY:
+                return SplitMatch([], 0, False)
+            window_days = self.split_window_days
+            min_day = max(bill_day - window_days, min_day if min_day is not None else NO_DAY)
+            max_day = bill_day + window_days if max_day is None else min(bill_day + window_days, max_day)
+        # Solo con ventana principal los bloques están ordenados por fecha interpretada
+        sorted_days = self.date_window_days is not None
+        nodes = 0
+
+        # Candidatos: cargos no consumidos de los bloques de la ventana con importe menor que la factura
+        candidates: List[Tuple[int, int, _ChargeBlock, int]] = []
+        for month in self._candidate_months(bill_day, window_days):
+            amounts = self._amounts.get(month)
+            if not amounts or (month == _UNDATED and window_days is not None):
+                continue
+            undated = month == _UNDATED
+            for amount in amounts[bisect_right(amounts, 0):bisect_left(amounts, amount_cents)]:
+                block = self._blocks[month][amount]
+                start = 0 if undated or min_day is None or not sorted_days else bisect_left(block.days, min_day)
+                pos = block.find(start)
+                while pos < len(block.ranks):
+                    day = block.days[pos]
+                    if sorted_days and not undated and max_day is not None and day > max_day:
+                        break
+                    nodes += 1
+                    if nodes > budget:
+                        return SplitMatch([], nodes, True)
+                    in_window = (
+                        undated or min_day is None
+                        or (day != NO_DAY and min_day <= day and (max_day is None or day <= max_day))
+                    )
+                    if in_window:
+                        candidates.append((block.ranks[pos], amount, block, pos))
+                    pos = block.find(pos + 1)
+        if len(candidates) < 2:
+            return SplitMatch([], nodes, False)
+
+        candidates.sort(key=lambda candidate: candidate[0])
+        cents = [candidate[1] for candidate in candidates]
+        by_cents: Dict[int, List[int]] = {}
+        for ordinal, amount in enumerate(cents):
+            by_cents.setdefault(amount, []).append(ordinal)
+
+        def last_pick(remaining: int, after: int) -> int:
+            """Ordinal más antiguo (> after) cuyo importe cierra la suma dentro de tolerancia; -1 si no hay."""
+            best = -1
+            for amount in range(max(remaining - self.tolerance_cents, 1), remaining + self.tolerance_cents + 1):
+                ordinals = by_cents.get(amount)
+                if ordinals:
+                    i = bisect_right(ordinals, after)
+                    if i < len(ordinals) and (best < 0 or ordinals[i] < best):
+                        best = ordinals[i]
+            return best
+
+        def search(remaining: int, picks_left: int, after: int, chosen: List[int]) -> Optional[List[int]]:
+            nonlocal nodes
+            nodes += 1
+            if nodes > budget:
+                raise _BudgetExhausted
+            if picks_left == 1:
+                ordinal = last_pick(remaining, after)
+                return chosen + [ordinal] if ordinal >= 0 else None
+            # Cada cargo posterior aporta al menos 1 centavo
+            ceiling = remaining + self.tolerance_cents - (picks_left - 1)
+            for ordinal in range(after + 1, len(candidates) - picks_left + 1):
+                if cents[ordinal] > ceiling:
+                    continue
+                found = search(remaining - cents[ordinal], picks_left - 1, ordinal, chosen + [ordinal])
+                if found is not None:
+                    return found
+            return None
+
+        for size in range(2, min(max_charges, len(candidates)) + 1):
+            try:
+                found = search(amount_cents, size, -1, [])
+            except _BudgetExhausted:
+                return SplitMatch([], nodes, True)
+            if found is not None:
+                labels = []
+                for ordinal in found:
+                    _, _, block, pos = candidates[ordinal]
+                    block.consume(pos)
+                    labels.append(block.labels[pos])
+                return SplitMatch(labels, nodes, False)
+        return SplitMatch([], nodes, False)
+
+
+class SplitMatch(NamedTuple):
+    labels: List[Hashable]
+    nodes: int
+    exhausted: bool
+
+
+class _BudgetExhausted(Exception):
+    pass
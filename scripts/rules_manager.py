@@ -4,16 +4,29 @@ Motor centralizado de reglas contables, resolución de entidades y validaciones.
 Único punto de acceso autorizado para leer e interpretar mapping_rules.xlsx.
 """
 
+import os
 import re
+import pickle
+import hashlib
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 
 from scripts.config import (
+    GL_DIRECTORY,
     MAPPING_RULES,
     PROPERTY_DIRECTORY,
+    RULES_SNAPSHOT,
     VENDOR_DIRECTORY
 )
+from scripts.fuzzy_match.candidate_index import FuzzyCandidateIndex
+from scripts.utils.excel_cache import CachedExcelFile
+from scripts.utils.fingerprint import describe_source, source_unchanged
+from scripts.utils.gl_tree import GLTree
+from scripts.utils.lru_cache import BoundedLRUCache, CACHE_MISS
+from scripts.utils.pattern_matcher import MultiPatternMatcher
+from scripts.utils.unique_values import UniqueValues, map_unique
 
 
 # ==============================================================================
@@ -30,20 +43,15 @@ def normalize_text(text: object) -> str:
     return cleaned.upper()
 
 
-# Fallback seguro de Fuzzy Matching
-try:
-    from rapidfuzz import process, fuzz
+def normalize_text_series(values: pd.Series) -> pd.Series:
+    """Variante por lotes de normalize_text (resultado idéntico elemento a elemento, nulos -> "")."""
+    return map_unique(values, normalize_text, "")
 
-    def get_best_match(query_norm: str, choices_norm: List[str], score_cutoff: int = 50) -> Tuple[Optional[str], float]:
-        if not query_norm or not choices_norm:
-            return None, 0.0
-        result = process.extractOne(query_norm, choices_norm, scorer=fuzz.token_set_ratio, score_cutoff=score_cutoff)
-        if result is None:
-            return None, 0.0
-        return result[0], float(result[1])
-except ImportError:
-    def get_best_match(query_norm: str, choices_norm: List[str], score_cutoff: int = 50) -> Tuple[Optional[str], float]:
-        return None, 0.0
+
+# Código corto al inicio de una pista de propiedad (p.ej. "1234 - UNIT 2" -> "1234")
+_PROPERTY_CODE_PREFIX = re.compile(r"^(\d{2,6})\b")
+
+_RESOLUTION_COLUMNS = ["target", "score", "method"]
 
 
 class RulesManager:
@@ -71,9 +79,50 @@ class RulesManager:
         "WINDOWS DOORS": "Windows & Doors"
     }
 
-    def __init__(self, rules_path: Path = MAPPING_RULES):
+    # 2. Filtro de Titularidad AMEX por defecto (si mapping_rules.xlsx no trae hoja 'Ownership')
+    #    owners: titulares autorizados | markers: marcas RAS en company/gl | exclusions: (titular, company)
+    _DEFAULT_OWNERSHIP_RULES: Dict[str, list] = {
+        "owners": ["ARMANDO ARMAS", "RICHARD LIBUTTI"],
+        "markers": ["RAS", "REITER"],
+        "exclusions": [("RICHARD LIBUTTI", "HAPPY TRAILERS")]
+    }
+
+    # Campos serializables del motor compilado (todo lo derivado de Excel/CSV antes de construir matchers).
+    # Incrementar _SNAPSHOT_VERSION ante cualquier cambio de estructura o de lógica de compilación.
+    _SNAPSHOT_VERSION = 3
+    _SNAPSHOT_FIELDS: Tuple[str, ...] = (
+        "vendor_to_gl",
+        "cash_accounts",
+        "property_groups",
+        "vendor_directory_map",
+        "property_directory_map",
+        "property_code_map",
+        "vendor_rule_keys",
+        "property_rule_keys",
+        "alerts_rules",
+        "ownership_rules",
+        "gl_tree"
+    )
+
+    def __init__(
+        self,
+        rules_path: Path = MAPPING_RULES,
+        cache_size: int = 50_000,
+        snapshot_path: Optional[Path] = RULES_SNAPSHOT
+    ):
         self.rules_path = rules_path
-        
+        # None desactiva el snapshot en disco y fuerza el parseo completo en cada construcción
+        self.snapshot_path = snapshot_path
+        self.loaded_from_snapshot = False
+
+        # Memoización de resoluciones (clave: texto normalizado + parámetros). Se vacía al recompilar.
+        self.resolution_cache = BoundedLRUCache(maxsize=cache_size)
+
+        self._reset_indices()
+        self._load_and_compile()
+
+    def _reset_indices(self) -> None:
+        """Inicializa vacíos todos los índices y matchers compilados."""
         # Índices en memoria O(1)
         self.vendor_to_gl: Dict[str, str] = {}
         self.cash_accounts: Dict[str, str] = {}
@@ -81,101 +130,275 @@ class RulesManager:
         self.vendor_directory_map: Dict[str, str] = {}
         self.property_directory_map: Dict[str, str] = {}
         self.property_code_map: Dict[str, str] = {}  # <-- Nuevo Índice O(1) por Código Corto
+        self.gl_tree = GLTree()  # Plan de cuentas (vacío si normalized_gl_accounts.csv no existe)
 
-        # Matchers y Catálogos
-        self.manual_vendor_matchers: List[Tuple[re.Pattern, str]] = []
-        self.vendor_regex_rules: List[Tuple[re.Pattern, str]] = []
-        self.property_regex_rules: List[Tuple[re.Pattern, str]] = []
+        # Claves de reglas Excel ya normalizadas y ordenadas por prioridad
+        self.vendor_rule_keys: List[Tuple[str, str]] = []
+        self.property_rule_keys: List[Tuple[str, str]] = []
+
+        # Reglas y Catálogos
         self.alerts_rules: List[dict] = []
+        self.ownership_rules: Dict[str, list] = {k: list(v) for k, v in self._DEFAULT_OWNERSHIP_RULES.items()}
         self.vendor_directory_choices: List[str] = []
         self.property_directory_choices: List[str] = []
 
+        # Autómatas multi-patrón (un único recorrido del texto por transacción)
+        self.vendor_matcher: MultiPatternMatcher[Tuple[str, str]] = MultiPatternMatcher()
+        self.property_matcher: MultiPatternMatcher[str] = MultiPatternMatcher()
+
+        # Índices de blocking para fuzzy (solo puntúan candidatos con bloque común)
+        self.vendor_fuzzy_index = FuzzyCandidateIndex([])
+        self.property_fuzzy_index = FuzzyCandidateIndex([])
+        # Código numérico explícito (property_code) -> propiedad
+        self.property_code_prefix_index: Dict[str, str] = {}
+        # Proveedor normalizado -> cuenta GL validada contra el plan; pistas con código inexistente
+        self.vendor_gl_index: Dict[str, str] = {}
+        self.invalid_gl_hints: List[str] = []
+
+    def reload(self) -> None:
+        """Recompila todas las reglas desde disco descartando índices y caché previos."""
+        self._reset_indices()
         self._load_and_compile()
 
+    def cache_stats(self) -> Dict[str, int]:
+        """Contadores acumulados de la caché de resolución (hits/misses/evictions)."""
+        return self.resolution_cache.stats()
+
     def _load_and_compile(self) -> None:
-        """Carga los DataFrames maestros y precalcula los índices y matchers compilados."""
+        """
+        Obtiene el estado compilado (snapshot en disco vigente o parseo completo de los
+        maestros) y construye a partir de él los matchers en memoria.
+        """
         if not self.rules_path.exists():
             raise FileNotFoundError(f"Archivo maestro no encontrado: {self.rules_path}")
 
-        # 1. Compilar Overrides Manuales sobre texto normalizado
-        self.manual_vendor_matchers = [
-            (re.compile(re.escape(normalize_text(k))), target)
-            for k, target in self._RAW_MANUAL_VENDOR_RULES.items()
-        ]
+        # Cualquier resolución memoizada pertenece a la versión anterior de las reglas
+        self.resolution_cache.clear()
+
+        self.loaded_from_snapshot = self._load_snapshot()
+        if not self.loaded_from_snapshot:
+            self._parse_sources()
+            self._save_snapshot()
+
+        self._build_matchers()
 
-        excel = pd.ExcelFile(self.rules_path)
-
-        # 2. Compilar Hoja 'Rules' (Manejo nativo de nulos)
-        if "Rules" in excel.sheet_names:
-            rules_df = pd.read_excel(excel, sheet_name="Rules")
-            if "priority" not in rules_df.columns:
-                rules_df["priority"] = 10
-            rules_df = rules_df.sort_values("priority", ascending=False)
-
-            for _, row in rules_df.iterrows():
-                raw_key = row.get("Raw_Text (Key)")
-                mapped_val = row.get("Mapped_Value")
-                category = row.get("Category")
-                gl_hint = row.get("GL_Account_Hint")
-
-                if pd.isna(raw_key) or pd.isna(mapped_val):
-                    continue
-
-                norm_key = normalize_text(raw_key)
-                norm_val = str(mapped_val).strip()
-                cat = normalize_text(category)
-
-                if not norm_key or not norm_val:
-                    continue
-
-                if cat == "VENDOR":
-                    pattern = re.compile(re.escape(norm_key))
-                    self.vendor_regex_rules.append((pattern, norm_val))
-
-                    if pd.notna(gl_hint) and str(gl_hint).strip():
-                        self.vendor_to_gl[normalize_text(norm_val)] = str(gl_hint).strip()
-
-                elif cat == "PROPERTY":
-                    pattern = re.compile(re.escape(norm_key))
-                    self.property_regex_rules.append((pattern, norm_val))
-
-                elif cat == "CASH":
-                    self.cash_accounts[norm_key.lower()] = norm_val
-
-        # 3. Compilar Hoja 'Allocations' (Prorrateos)
-        if "Allocations" in excel.sheet_names:
-            alloc_df = pd.read_excel(excel, sheet_name="Allocations")
-            alloc_df.columns = alloc_df.columns.str.strip()
-            alloc_df = alloc_df.dropna(subset=["Group_Name", "Property_Code"])
-            if "Weight" not in alloc_df.columns:
-                alloc_df["Weight"] = 1.0
-
-            for group_name, group_data in alloc_df.groupby("Group_Name"):
-                props = []
-                for _, r in group_data.iterrows():
-                    prop_code = str(r["Property_Code"]).strip()
-                    weight = float(r["Weight"])
-                    props.append((prop_code, weight))
-                self.property_groups[normalize_text(group_name)] = props
-
-        # 4. Compilar Hoja 'Alerts' (Validaciones)
-        if "Alerts" in excel.sheet_names:
-            alerts_df = pd.read_excel(excel, sheet_name="Alerts")
-            for _, r in alerts_df.iterrows():
-                r_type = r.get("Rule_Type")
-                if pd.isna(r_type) or not str(r_type).strip():
-                    continue
-
-                self.alerts_rules.append({
-                    "type": normalize_text(r_type),
-                    "acc": normalize_text(r.get("Account_Contains")),
-                    "comp": normalize_text(r.get("Company_Contains")),
-                    "miss_gl": normalize_text(r.get("Missing_Keyword_GL")),
-                    "miss_comp": normalize_text(r.get("Missing_Keyword_Company")),
-                    "msg": str(r.get("Message", "")).strip() if pd.notna(r.get("Message")) else ""
-                })
-
-        # 5. Cargar Catálogos Canónicos para Fuzzy Matching
+    # ==============================================================================
+    # SNAPSHOT DEL MOTOR COMPILADO
+    # ==============================================================================
+    def _snapshot_sources(self) -> Dict[str, Path]:
+        return {
+            "mapping_rules": self.rules_path,
+            "vendor_directory": VENDOR_DIRECTORY,
+            "property_directory": PROPERTY_DIRECTORY,
+            "gl_directory": GL_DIRECTORY
+        }
+
+    def _snapshot_version_key(self) -> Tuple[int, str]:
+        """Versión del formato + huella de las reglas que viven en código (overrides y titularidad por defecto)."""
+        code_rules_repr = repr((
+            sorted(self._RAW_MANUAL_VENDOR_RULES.items()),
+            sorted(self._DEFAULT_OWNERSHIP_RULES.items())
+        ))
+        return self._SNAPSHOT_VERSION, hashlib.sha256(code_rules_repr.encode("utf-8")).hexdigest()
+
+    def _load_snapshot(self) -> bool:
+        """Restaura el estado compilado si el snapshot existe y sus fuentes no cambiaron."""
+        if self.snapshot_path is None or not self.snapshot_path.exists():
+            return False
+
+        try:
+            with open(self.snapshot_path, "rb") as fh:
+                snapshot = pickle.load(fh)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            return False
+
+        if snapshot.get("version") != self._snapshot_version_key():
+            return False
+
+        recorded_sources = snapshot.get("sources", {})
+        for name, path in self._snapshot_sources().items():
+            recorded = recorded_sources.get(name)
+            if recorded is not None and recorded.get("path") != str(path):
+                return False
+            if not source_unchanged(path, recorded):
+                return False
+
+        state = snapshot.get("state", {})
+        if any(field not in state for field in self._SNAPSHOT_FIELDS):
+            return False
+        for field in self._SNAPSHOT_FIELDS:
+            setattr(self, field, state[field])
+        return True
+
+    def _save_snapshot(self) -> None:
+        """Persiste el estado compilado de forma atómica (escritura temporal + replace)."""
+        if self.snapshot_path is None:
+            return
+
+        sources = {}
+        for name, path in self._snapshot_sources().items():
+            description = describe_source(path)
+            if description is not None:
+                description["path"] = str(path)
+            sources[name] = description
+
+        snapshot = {
+            "version": self._snapshot_version_key(),
+            "sources": sources,
+            "state": {field: getattr(self, field) for field in self._SNAPSHOT_FIELDS}
+        }
+
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.snapshot_path.with_suffix(self.snapshot_path.suffix + ".tmp")
+        with open(tmp_path, "wb") as fh:
+            pickle.dump(snapshot, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.snapshot_path)
+
+    # ==============================================================================
+    # COMPILACIÓN DESDE FUENTES
+    # ==============================================================================
+    def _build_matchers(self) -> None:
+        """Construye matchers y catálogos de búsqueda a partir del estado compilado."""
+        # 1. Overrides Manuales sobre texto normalizado
+        manual_keys = [(normalize_text(k), target) for k, target in self._RAW_MANUAL_VENDOR_RULES.items()]
+
+        # Autómata único de proveedores: overrides manuales primero, luego reglas Excel por prioridad
+        self.vendor_matcher = MultiPatternMatcher(
+            [(key, (target, "manual_override")) for key, target in manual_keys]
+            + [(key, (target, "excel_rule")) for key, target in self.vendor_rule_keys]
+        )
+        self.property_matcher = MultiPatternMatcher(self.property_rule_keys)
+
+        self.vendor_directory_choices = list(self.vendor_directory_map.keys())
+        self.vendor_fuzzy_index = FuzzyCandidateIndex(self.vendor_directory_choices)
+
+        # Catálogo de propiedades preprocesado una sola vez para el nivel difuso
+        self.property_directory_choices = list(self.property_directory_map.keys())
+        self.property_fuzzy_index = FuzzyCandidateIndex(self.property_directory_choices)
+        self.property_code_prefix_index = self._build_property_code_prefix_index()
+        self._build_vendor_gl_index()
+
+    def _build_property_code_prefix_index(self) -> Dict[str, str]:
+        """
+        Índice código numérico -> propiedad construido solo a partir de property_code explícitos.
+        El número de calle de los nombres del catálogo no identifica la propiedad ("88 NE 1st Ave"
+        no es "88 Ocean Dr"), así que esas pistas siguen al nivel difuso o a revisión manual.
+        """
+        return {
+            code_norm: real_p
+            for code_norm, real_p in self.property_code_map.items()
+            if _PROPERTY_CODE_PREFIX.fullmatch(code_norm)
+        }
+
+    def _build_vendor_gl_index(self) -> None:
+        """
+        Valida cada GL_Account_Hint contra el plan de cuentas y lo fija en su etiqueta canónica
+        'código: nombre'. Sin plan cargado las pistas se usan tal cual; las que referencian un código
+        inexistente se conservan (no se reasignan en silencio) y quedan en invalid_gl_hints para el orquestador.
+        """
+        self.vendor_gl_index = {}
+        self.invalid_gl_hints = []
+        for norm_vendor, gl_hint in self.vendor_to_gl.items():
+            label = self.gl_tree.canonical_label(gl_hint) if len(self.gl_tree) else gl_hint
+            if label is None:
+                self.invalid_gl_hints.append(gl_hint)
+                label = gl_hint
+            self.vendor_gl_index[norm_vendor] = label
+
+    def _parse_sources(self) -> None:
+        """Carga los DataFrames maestros y precalcula los índices serializables."""
+        with CachedExcelFile(self.rules_path) as excel:
+            # 2. Compilar Hoja 'Rules' (Manejo nativo de nulos)
+            if "Rules" in excel.sheet_names:
+                rules_df = excel.parse("Rules")
+                if "priority" not in rules_df.columns:
+                    rules_df["priority"] = 10
+                rules_df = rules_df.sort_values("priority", ascending=False)
+
+                for _, row in rules_df.iterrows():
+                    raw_key = row.get("Raw_Text (Key)")
+                    mapped_val = row.get("Mapped_Value")
+                    category = row.get("Category")
+                    gl_hint = row.get("GL_Account_Hint")
+
+                    if pd.isna(raw_key) or pd.isna(mapped_val):
+                        continue
+
+                    norm_key = normalize_text(raw_key)
+                    norm_val = str(mapped_val).strip()
+                    cat = normalize_text(category)
+
+                    if not norm_key or not norm_val:
+                        continue
+
+                    if cat == "VENDOR":
+                        self.vendor_rule_keys.append((norm_key, norm_val))
+
+                        if pd.notna(gl_hint) and str(gl_hint).strip():
+                            self.vendor_to_gl[normalize_text(norm_val)] = str(gl_hint).strip()
+
+                    elif cat == "PROPERTY":
+                        self.property_rule_keys.append((norm_key, norm_val))
+
+                    elif cat == "CASH":
+                        self.cash_accounts[norm_key.lower()] = norm_val
+
+            # 3. Compilar Hoja 'Allocations' (Prorrateos)
+            if "Allocations" in excel.sheet_names:
+                alloc_df = excel.parse("Allocations")
+                alloc_df.columns = alloc_df.columns.str.strip()
+                alloc_df = alloc_df.dropna(subset=["Group_Name", "Property_Code"])
+                if "Weight" not in alloc_df.columns:
+                    alloc_df["Weight"] = 1.0
+
+                for group_name, group_data in alloc_df.groupby("Group_Name"):
+                    props = []
+                    for _, r in group_data.iterrows():
+                        prop_code = str(r["Property_Code"]).strip()
+                        weight = float(r["Weight"])
+                        props.append((prop_code, weight))
+                    self.property_groups[normalize_text(group_name)] = props
+
+            # 4. Compilar Hoja 'Alerts' (Validaciones)
+            if "Alerts" in excel.sheet_names:
+                alerts_df = excel.parse("Alerts")
+                for _, r in alerts_df.iterrows():
+                    r_type = r.get("Rule_Type")
+                    if pd.isna(r_type) or not str(r_type).strip():
+                        continue
+
+                    self.alerts_rules.append({
+                        "type": normalize_text(r_type),
+                        "acc": normalize_text(r.get("Account_Contains")),
+                        "comp": normalize_text(r.get("Company_Contains")),
+                        "miss_gl": normalize_text(r.get("Missing_Keyword_GL")),
+                        "miss_comp": normalize_text(r.get("Missing_Keyword_Company")),
+                        "msg": str(r.get("Message", "")).strip() if pd.notna(r.get("Message")) else ""
+                    })
+
+            # 5. Compilar Hoja 'Ownership' (Filtro de titularidad AMEX)
+            if "Ownership" in excel.sheet_names:
+                ownership_df = excel.parse("Ownership")
+                parsed: Dict[str, list] = {"owners": [], "markers": [], "exclusions": []}
+                for _, r in ownership_df.iterrows():
+                    r_type = normalize_text(r.get("Rule_Type"))
+                    keyword = normalize_text(r.get("Keyword"))
+                    if not keyword:
+                        continue
+
+                    if r_type == "OWNER":
+                        parsed["owners"].append(keyword)
+                    elif r_type == "MARKER":
+                        parsed["markers"].append(keyword)
+                    elif r_type == "EXCLUDE":
+                        company_kw = normalize_text(r.get("Company_Contains"))
+                        if company_kw:
+                            parsed["exclusions"].append((keyword, company_kw))
+
+                if any(parsed.values()):
+                    self.ownership_rules = parsed
+
+        # 6. Cargar Catálogos Canónicos para Fuzzy Matching
         if VENDOR_DIRECTORY.exists():
             v_df = pd.read_csv(VENDOR_DIRECTORY)
             if "normalized_company" in v_df.columns and "company_name" in v_df.columns:
@@ -183,7 +406,6 @@ class RulesManager:
                 for _, r in valid_v.iterrows():
                     norm_c = normalize_text(r["normalized_company"])
                     self.vendor_directory_map[norm_c] = str(r["company_name"]).strip()
-                self.vendor_directory_choices = list(self.vendor_directory_map.keys())
 
         if PROPERTY_DIRECTORY.exists():
             p_df = pd.read_csv(PROPERTY_DIRECTORY)
@@ -200,40 +422,92 @@ class RulesManager:
                         if code_norm:
                             self.property_code_map[code_norm] = real_p
 
+        # 7. Plan de cuentas (jerarquía GL) para validar pistas de cuenta
+        if GL_DIRECTORY.exists():
+            self.gl_tree = GLTree.from_csv(GL_DIRECTORY)
+
     # ==============================================================================
     # RESOLVERS Y EVALUADORES
     # ==============================================================================
+    def _match_vendor_rules(self, norm_merchant: str) -> Optional[Tuple[str, float, str]]:
+        """Niveles determinísticos 1-2 (Manual Override + Reglas Excel) en un solo recorrido Aho-Corasick."""
+        rule_hit = self.vendor_matcher.first_match(norm_merchant)
+        if rule_hit is None:
+            return None
+        target, method = rule_hit
+        return target, 100.0, method
+
+    def _match_property_rules(self, norm_prop: str) -> Optional[Tuple[str, float, str]]:
+        """Niveles determinísticos 1-4 de propiedades (Regla Excel, Nombre exacto, Código corto, Prefijo de código)."""
+        rule_target = self.property_matcher.first_match(norm_prop)
+        if rule_target is not None:
+            return rule_target, 100.0, "excel_rule"
+
+        if norm_prop in self.property_directory_map:
+            return self.property_directory_map[norm_prop], 100.0, "directory_exact"
+
+        if norm_prop in self.property_code_map:
+            return self.property_code_map[norm_prop], 100.0, "directory_code"
+
+        match = _PROPERTY_CODE_PREFIX.match(norm_prop)
+        if match and match.group(1) in self.property_code_prefix_index:
+            return self.property_code_prefix_index[match.group(1)], 100.0, "directory_code_prefix"
+
+        return None
+
+    def _resolve_vendor_norm(self, norm_merchant: str, score_cutoff: int) -> Optional[Tuple[str, float, str]]:
+        """Niveles 1-3 sobre texto normalizado; None equivale a Fallback Raw."""
+        rule_hit = self._match_vendor_rules(norm_merchant)
+        if rule_hit is not None:
+            return rule_hit
+
+        if self.vendor_directory_choices:
+            match_norm, score = self.vendor_fuzzy_index.best_match(norm_merchant, score_cutoff=score_cutoff)
+            if match_norm and match_norm in self.vendor_directory_map:
+                return self.vendor_directory_map[match_norm], score, "fuzzy_match"
+
+        return None
+
+    def _resolve_property_norm(self, norm_prop: str, score_cutoff: int) -> Optional[Tuple[str, float, str]]:
+        """Niveles 1-5 sobre texto normalizado; None equivale a Reporte de Revisión."""
+        rule_hit = self._match_property_rules(norm_prop)
+        if rule_hit is not None:
+            return rule_hit
+
+        if self.property_directory_choices:
+            match_norm, score = self.property_fuzzy_index.best_match(norm_prop, score_cutoff=score_cutoff)
+            if match_norm and match_norm in self.property_directory_map:
+                return self.property_directory_map[match_norm], score, "fuzzy_match"
+
+        return None
+
+    def _cached(self, key: tuple, compute) -> object:
+        """Consulta la caché LRU y, ante un fallo, calcula y memoiza el resultado (incluido None)."""
+        value = self.resolution_cache.get(key)
+        if value is CACHE_MISS:
+            value = compute()
+            self.resolution_cache.put(key, value)
+        return value
+
     def resolve_vendor(self, merchant_raw: object, score_cutoff: int = 67) -> Tuple[str, float, str]:
         """
         Jerarquía Determinística (Evaluada 100% sobre texto normalizado):
         1. Manual Override
         2. Exact / Pattern Rule en Excel Maestro
-        3. Fuzzy Match sobre vendor_directory
+        3. Fuzzy Match sobre vendor_directory (solo candidatos del índice de blocking)
         4. Fallback Raw
         """
         norm_merchant = normalize_text(merchant_raw)
         if not norm_merchant:
             return "UNKNOWN VENDOR", 0.0, "unresolved"
 
-        raw_display = str(merchant_raw).strip()
-
-        # 1. Manual Overrides
-        for pattern, target in self.manual_vendor_matchers:
-            if pattern.search(norm_merchant):
-                return target, 100.0, "manual_override"
-
-        # 2. Excel Rules
-        for pattern, target in self.vendor_regex_rules:
-            if pattern.search(norm_merchant):
-                return target, 100.0, "excel_rule"
-
-        # 3. Fuzzy Match
-        if self.vendor_directory_choices:
-            match_norm, score = get_best_match(norm_merchant, self.vendor_directory_choices, score_cutoff=score_cutoff)
-            if match_norm and match_norm in self.vendor_directory_map:
-                return self.vendor_directory_map[match_norm], score, "fuzzy_match"
-
-        return raw_display, 0.0, "fallback_raw"
+        resolved = self._cached(
+            ("vendor", norm_merchant, score_cutoff),
+            lambda: self._resolve_vendor_norm(norm_merchant, score_cutoff)
+        )
+        if resolved is None:
+            return str(merchant_raw).strip(), 0.0, "fallback_raw"
+        return resolved
 
     def resolve_property(self, prop_hint_raw: object, score_cutoff: int = 75) -> Tuple[str, float, str]:
         """
@@ -241,47 +515,176 @@ class RulesManager:
         1. Reglas / Aliases Explícitos en Excel Maestro (mapping_rules.xlsx)
         2. Búsqueda Exacta por Nombre en Catálogo O(1) (normalized_property_directory.csv)
         3. Búsqueda por Código Corto en Catálogo O(1) (property_code_map)
-        4. Coincidencia Difusa O(M) sobre el Catálogo
-        5. Fallback a Reporte de Revisión
+        4. Prefijo de Código O(1): número inicial igual a un property_code explícito (p.ej. "1234 - Unit 2")
+        5. Coincidencia Difusa sobre el Catálogo (índice de blocking precomputado)
+        6. Fallback a Reporte de Revisión
         """
         norm_prop = normalize_text(prop_hint_raw)
         if not norm_prop:
             return "REVISAR PROP: VACIO", 0.0, "unresolved"
 
-        raw_display = str(prop_hint_raw).strip()
-
-        # 1. Reglas Explícitas en Excel
-        for pattern, target in self.property_regex_rules:
-            if pattern.search(norm_prop):
-                return target, 100.0, "excel_rule"
-
-        # 2. Match Exacto por Nombre O(1)
-        if norm_prop in self.property_directory_map:
-            return self.property_directory_map[norm_prop], 100.0, "directory_exact"
+        resolved = self._cached(
+            ("property", norm_prop, score_cutoff),
+            lambda: self._resolve_property_norm(norm_prop, score_cutoff)
+        )
+        if resolved is None:
+            return f"REVISAR PROP: {str(prop_hint_raw).strip()}", 0.0, "unresolved"
+        return resolved
 
-        # 3. Match Exacto por Código Corto O(1)
-        if norm_prop in self.property_code_map:
-            return self.property_code_map[norm_prop], 100.0, "directory_code"
-
-        # 4. Fuzzy Matching O(M)
-        if self.property_directory_choices:
-            match_norm, score = get_best_match(norm_prop, self.property_directory_choices, score_cutoff=score_cutoff)
-            if match_norm and match_norm in self.property_directory_map:
-                return self.property_directory_map[match_norm], score, "fuzzy_match"
-
-        return f"REVISAR PROP: {raw_display}", 0.0, "unresolved"
+    # ==============================================================================
+    # RESOLUCIÓN POR LOTES (Series completas)
+    # ==============================================================================
+    def _resolve_unique_norms(
+        self,
+        kind: str,
+        norms: List[str],
+        score_cutoff: int,
+        workers: int
+    ) -> Dict[str, Optional[Tuple[str, float, str]]]:
+        """
+        Resuelve cada valor normalizado único una sola vez: primero la caché LRU, luego los
+        niveles determinísticos y finalmente todos los fallbacks difusos juntos vía cdist.
+        """
+        if kind == "vendor":
+            match_rules = self._match_vendor_rules
+            choices, directory_map = self.vendor_directory_choices, self.vendor_directory_map
+            score_fuzzy = self.vendor_fuzzy_index.best_matches
+        else:
+            match_rules = self._match_property_rules
+            choices, directory_map = self.property_directory_choices, self.property_directory_map
+            score_fuzzy = self.property_fuzzy_index.best_matches
+
+        resolved: Dict[str, Optional[Tuple[str, float, str]]] = {}
+        computed: List[str] = []
+        pending: List[str] = []
+        for norm in dict.fromkeys(n for n in norms if n):
+            cached = self.resolution_cache.get((kind, norm, score_cutoff))
+            if cached is not CACHE_MISS:
+                resolved[norm] = cached
+                continue
+            computed.append(norm)
+            resolved[norm] = match_rules(norm)
+            if resolved[norm] is None:
+                pending.append(norm)
+
+        if pending and choices:
+            fuzzy_hits = score_fuzzy(pending, score_cutoff=score_cutoff, workers=workers)
+            for norm, (match_norm, score) in zip(pending, fuzzy_hits):
+                if match_norm and match_norm in directory_map:
+                    resolved[norm] = (directory_map[match_norm], score, "fuzzy_match")
+
+        for norm in computed:
+            self.resolution_cache.put((kind, norm, score_cutoff), resolved[norm])
+        return resolved
+
+    def resolve_vendors(self, merchants: pd.Series, score_cutoff: int = 67, workers: int = -1) -> pd.DataFrame:
+        """
+        Versión por lotes de resolve_vendor con resultados idénticos fila a fila.
+        Resuelve una sola vez cada valor normalizado único y puntúa todos los fallbacks
+        difusos juntos con process.cdist. Devuelve columnas target/score/method alineadas al índice.
+        """
+        unique_merchants = UniqueValues(merchants)
+        norms = [normalize_text(u) for u in unique_merchants.uniques]
+        resolved = self._resolve_unique_norms("vendor", norms, score_cutoff, workers)
+
+        rows = [
+            (resolved[norm] or (str(raw).strip(), 0.0, "fallback_raw")) if norm
+            else ("UNKNOWN VENDOR", 0.0, "unresolved")
+            for raw, norm in zip(unique_merchants.uniques, norms)
+        ]
+        return self._expand_resolutions(rows, unique_merchants, ("UNKNOWN VENDOR", 0.0, "unresolved"))
+
+    def resolve_properties(self, prop_hints: pd.Series, score_cutoff: int = 75, workers: int = -1) -> pd.DataFrame:
+        """Versión por lotes de resolve_property (mismas garantías que resolve_vendors)."""
+        unique_hints = UniqueValues(prop_hints)
+        norms = [normalize_text(u) for u in unique_hints.uniques]
+        resolved = self._resolve_unique_norms("property", norms, score_cutoff, workers)
+
+        rows = [
+            (resolved[norm] or (f"REVISAR PROP: {str(raw).strip()}", 0.0, "unresolved")) if norm
+            else ("REVISAR PROP: VACIO", 0.0, "unresolved")
+            for raw, norm in zip(unique_hints.uniques, norms)
+        ]
+        return self._expand_resolutions(rows, unique_hints, ("REVISAR PROP: VACIO", 0.0, "unresolved"))
+
+    @staticmethod
+    def _expand_resolutions(
+        rows: List[Tuple[str, float, str]],
+        unique_values: UniqueValues,
+        null_row: Tuple[str, float, str]
+    ) -> pd.DataFrame:
+        """Reexpande los resultados por valor único a las filas originales (nulos -> null_row)."""
+        table = pd.DataFrame(rows + [null_row], columns=_RESOLUTION_COLUMNS)
+        expanded = table.iloc[unique_values.codes].reset_index(drop=True)
+        expanded.index = unique_values.index
+        return expanded
 
     def resolve_gl(self, resolved_vendor: str, default_gl: str = "6435: General Repairs") -> str:
-        """Lookup O(1) de cuenta contable por proveedor resuelto."""
+        """Lookup O(1) de cuenta contable (validada contra el plan de cuentas) por proveedor resuelto."""
         if not resolved_vendor:
             return default_gl
-        return self.vendor_to_gl.get(normalize_text(resolved_vendor), default_gl)
+        norm_vendor = normalize_text(resolved_vendor)
+        return self._cached(
+            ("gl", norm_vendor, default_gl),
+            lambda: self.vendor_gl_index.get(norm_vendor, default_gl)
+        )
 
     def resolve_cash_account(self, card_key: str, default_cash: str = "1150: Operating") -> str:
         """Lookup O(1) de cuenta de contrapartida bancaria."""
         if not card_key:
             return default_cash
-        return self.cash_accounts.get(str(card_key).lower().strip(), default_cash)
+        norm_key = str(card_key).lower().strip()
+        return self._cached(
+            ("cash", norm_key, default_cash),
+            lambda: self.cash_accounts.get(norm_key, default_cash)
+        )
+
+    def evaluate_alerts(self, df: pd.DataFrame) -> Tuple[pd.Series, pd.Series]:
+        """
+        Evaluación vectorizada de la hoja 'Alerts' sobre el DataFrame completo.
+        Idéntica a aplicar evaluate_row_alerts fila a fila: cada columna se normaliza una vez,
+        cada palabra clave distinta produce una única máscara y np.select aplica la semántica
+        de "primera regla que coincide".
+        """
+        if not self.alerts_rules or df.empty:
+            return (
+                pd.Series("OK", index=df.index, dtype=object),
+                pd.Series("", index=df.index, dtype=object)
+            )
+
+        columns = {}
+        for key, col in (("acc", "account_holder"), ("comp", "company"), ("gl", "gl_account")):
+            raw = df[col] if col in df.columns else pd.Series(None, index=df.index, dtype=object)
+            columns[key] = UniqueValues(normalize_text_series(raw))
+
+        mask_cache: Dict[Tuple[str, str], np.ndarray] = {}
+
+        def contains(key: str, keyword: str) -> np.ndarray:
+            if (key, keyword) not in mask_cache:
+                unique_values = columns[key]
+                unique_mask = unique_values.uniques.str.contains(keyword, regex=False).to_numpy(dtype=bool)
+                mask_cache[(key, keyword)] = unique_values.expand(unique_mask, False, bool)
+            return mask_cache[(key, keyword)]
+
+        conditions = []
+        for rule in self.alerts_rules:
+            match = np.ones(len(df), dtype=bool)
+            if rule["acc"]:
+                match &= contains("acc", rule["acc"])
+            if rule["comp"]:
+                match &= contains("comp", rule["comp"])
+            if rule["miss_gl"]:
+                match &= ~contains("gl", rule["miss_gl"])
+            if rule["miss_comp"]:
+                match &= ~contains("comp", rule["miss_comp"])
+            conditions.append(match)
+
+        status = np.select(conditions, [rule["type"] for rule in self.alerts_rules], default="OK")
+        message = np.select(conditions, [rule["msg"] for rule in self.alerts_rules], default="")
+        return (
+            pd.Series(status, index=df.index, dtype=object),
+            pd.Series(message, index=df.index, dtype=object)
+        )
 
     def evaluate_row_alerts(self, row: pd.Series) -> Tuple[str, str]:
         """Evaluación determinística de alertas sin comparaciones artificiales con 'NAN'."""
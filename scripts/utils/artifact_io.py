@@ -0,0 +1,167 @@
+"""
+scripts/utils/artifact_io.py
+Lectura/escritura tipada de artefactos intermedios (Parquet, Feather o CSV según el sufijo de la ruta).
+Ambos extremos aplican el mismo contrato de tipos, por lo que no hay deriva de dtypes entre etapas.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+_COLUMNAR_SUFFIXES = {".parquet", ".feather"}
+
+
+def resolve_artifact_path(path: Path) -> Path:
+    """Ruta efectiva del artefacto: sin pyarrow, los formatos columnares se degradan a CSV."""
+    if path.suffix in _COLUMNAR_SUFFIXES and pa is None:
+        return path.with_suffix(".csv")
+    return path
+
+
+def _as_text(series: pd.Series) -> pd.Series:
+    values = series.astype(object)
+    text = values.where(values.isna(), values.astype(str)).astype(object)
+    return text.mask(text == "", np.nan)
+
+
+def _is_datetime(dtype: str) -> bool:
+    return dtype.startswith("datetime64")
+
+
+def _as_datetime(series: pd.Series, dtype: str) -> pd.Series:
+    """Columnas ya tipadas se conservan; el texto ISO (respaldo CSV) se interpreta una única vez."""
+    if not pd.api.types.is_datetime64_any_dtype(series.dtype):
+        series = pd.to_datetime(series, format="ISO8601", errors="coerce")
+    return series.astype(dtype)
+
+
+def apply_schema(df: pd.DataFrame, dtypes: Dict[str, str]) -> pd.DataFrame:
+    """
+    Proyecta `df` al contrato `dtypes` (orden incluido):
+    - float64: conversión numérica (no numéricos -> NaN).
+    - datetime64[ns]: fechas tipadas (texto ISO no interpretable -> NaT).
+    - object: texto; valores no textuales se convierten con str() y "" se representa como nulo.
+    Columnas ausentes se crean nulas.
+    """
+    typed = {}
+    for col, dtype in dtypes.items():
+        series = df[col] if col in df.columns else pd.Series(np.nan, index=df.index, dtype=object)
+        if dtype == "object":
+            typed[col] = _as_text(series)
+        elif _is_datetime(dtype):
+            typed[col] = _as_datetime(series, dtype)
+        else:
+            typed[col] = pd.to_numeric(series, errors="coerce").astype(dtype)
+    return pd.DataFrame(typed, index=df.index)
+
+
+def _arrow_schema(dtypes: Dict[str, str]) -> "pa.Schema":
+    return pa.schema([
+        (col, pa.string() if dtype == "object" else pa.from_numpy_dtype(np.dtype(dtype)))
+        for col, dtype in dtypes.items()
+    ])
+
+
+def _csv_ready(typed: pd.DataFrame, dtypes: Dict[str, str]) -> pd.DataFrame:
+    """Respaldo CSV: las fechas se serializan como texto ISO (YYYY-MM-DD), NaT -> vacío."""
+    date_cols = [col for col, dtype in dtypes.items() if _is_datetime(dtype)]
+    if not date_cols:
+        return typed
+    return typed.assign(**{col: typed[col].dt.strftime("%Y-%m-%d") for col in date_cols})
+
+
+class ArtifactWriter:
+    """
+    Escritor por bloques de un artefacto tipado. Permite anexar DataFrames sucesivos (streaming)
+    sin materializar el total en memoria. Escribe sobre un temporal y lo publica con os.replace al cerrar.
+    """
+
+    def __init__(self, path: Path, dtypes: Dict[str, str]):
+        self.path = resolve_artifact_path(path)
+        self.dtypes = dtypes
+        self.rows = 0
+        self._tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        self._fh = None
+        self._writer = None
+
+        if self.path.suffix == ".parquet":
+            self._writer = pq.ParquetWriter(str(self._tmp_path), _arrow_schema(dtypes))
+        elif self.path.suffix == ".feather":
+            self._writer = pa.ipc.new_file(str(self._tmp_path), _arrow_schema(dtypes))
+        else:
+            # Un único handle: el BOM de utf-8-sig se escribe una sola vez al inicio del archivo
+            self._fh = open(self._tmp_path, "w", encoding="utf-8-sig", newline="")
+            pd.DataFrame(columns=list(dtypes)).to_csv(self._fh, index=False)
+
+    def write(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        typed = apply_schema(df, self.dtypes)
+        if self._writer is not None:
+            table = pa.Table.from_pandas(typed, schema=_arrow_schema(self.dtypes), preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            _csv_ready(typed, self.dtypes).to_csv(self._fh, index=False, header=False)
+        self.rows += len(typed)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._fh is not None:
+            self._fh.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self) -> None:
+        try:
+            if self._writer is not None:
+                self._writer.close()
+            if self._fh is not None:
+                self._fh.close()
+        finally:
+            self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "ArtifactWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_artifact(df: pd.DataFrame, path: Path, dtypes: Dict[str, str]) -> Path:
+    """Escribe `df` completo con el contrato `dtypes`; devuelve la ruta efectiva."""
+    with ArtifactWriter(path, dtypes) as writer:
+        writer.write(df)
+    return writer.path
+
+
+def read_artifact(path: Path, dtypes: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """Lee un artefacto intermedio en su formato efectivo y, si se indica, aplica el contrato `dtypes`."""
+    path = resolve_artifact_path(path)
+    if path.suffix == ".parquet":
+        df = pd.read_parquet(path)
+    elif path.suffix == ".feather":
+        df = pd.read_feather(path)
+    elif dtypes is not None:
+        # Solo "" es nulo: literales como "NA" o "null" se conservan igual que en los formatos columnares.
+        # Las fechas se leen como texto y apply_schema las tipa.
+        df = pd.read_csv(
+            path,
+            dtype={col: "object" if _is_datetime(dtype) else dtype for col, dtype in dtypes.items()},
+            keep_default_na=False,
+            na_values=[""]
+        )
+    else:
+        df = pd.read_csv(path)
+    return apply_schema(df, dtypes) if dtypes is not None else df
@@ -0,0 +1,64 @@
+"""
+scripts/utils/currency.py
+Parser vectorizado y compartido de importes monetarios para extractos y ledger.
+Acepta "$", separadores de miles, negativos entre paréntesis, signo final ("12.50-") y celdas vacías.
+"""
+
+from typing import Iterable, Union
+
+import numpy as np
+import pandas as pd
+
+from scripts.utils.unique_values import UniqueValues
+
+# Cualquier carácter que no sea dígito o punto decimal ($, comas, espacios, signos, paréntesis, "USD")
+_NON_NUMERIC = r"[^\d.]"
+_NEGATIVE_MARKER = r"[(\-]"
+
+CurrencyInput = Union[pd.Series, Iterable[object]]
+
+
+def _parse_text_values(uniques: pd.Series) -> np.ndarray:
+    """Convierte valores distintos (texto o números sueltos en columnas object) a float; inválidos -> NaN."""
+    parsed = np.full(len(uniques), np.nan, dtype=np.float64)
+
+    is_number = np.fromiter((not isinstance(v, str) for v in uniques), dtype=bool, count=len(uniques))
+    if is_number.any():
+        parsed[is_number] = pd.to_numeric(uniques[is_number], errors="coerce").to_numpy(dtype=np.float64)
+
+    text = uniques[~is_number].astype(str)
+    if len(text):
+        # Un único escaneo: "(" (contable), "-" inicial, tras "$" o final marcan el importe como negativo
+        negative = text.str.contains(_NEGATIVE_MARKER, regex=True)
+        magnitude = pd.to_numeric(text.str.replace(_NON_NUMERIC, "", regex=True), errors="coerce").to_numpy(dtype=np.float64)
+        parsed[~is_number] = np.where(negative.to_numpy(dtype=bool), -magnitude, magnitude)
+    return parsed
+
+
+def _parse_float(values: CurrencyInput) -> np.ndarray:
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+
+    # Atajo: columnas ya numéricas (Excel, CSV tipado) no pasan por texto
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        return series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    # Cada texto distinto se interpreta una sola vez; los nulos toman NaN
+    unique_values = UniqueValues(series)
+    return unique_values.expand(_parse_text_values(unique_values.uniques), np.nan, np.float64)
+
+
+def parse_currency_cents(values: CurrencyInput) -> np.ndarray:
+    """
+    Importes en centavos enteros (int64). Vacíos e inválidos valen 0.
+    El redondeo a centavos es el mismo de np.round(x, 2), por lo que cents / 100 reproduce ese resultado.
+    """
+    amounts = _parse_float(values)
+    cents = np.rint(amounts * 100)
+    cents[~np.isfinite(cents)] = 0
+    return cents.astype(np.int64)
+
+
+def parse_currency(values: CurrencyInput) -> pd.Series:
+    """Importes como float64 redondeados a 2 decimales (alineados al índice de entrada si es una Series)."""
+    index = values.index if isinstance(values, pd.Series) else None
+    return pd.Series(parse_currency_cents(values) / 100.0, index=index, dtype=np.float64)
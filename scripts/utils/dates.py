@@ -0,0 +1,82 @@
+"""
+scripts/utils/dates.py
+Parseo de fechas con formato explícito inferido una vez por fuente a partir de una muestra.
+Solo las filas que no cumplen el formato pasan por el parseo elemento a elemento, y las que aun así
+no se interpretan se contabilizan como coerced (NaT) en lugar de perderse en silencio.
+"""
+
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+from scripts.config import DATE_FORMAT_CANDIDATES, DATE_INFERENCE_SAMPLE
+from scripts.utils.unique_values import UniqueValues
+
+
+def _parsed_count(sample: pd.Series, fmt: str) -> int:
+    return int(pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum())
+
+
+def infer_date_format(
+    sample: pd.Series,
+    candidates: Iterable[str] = DATE_FORMAT_CANDIDATES
+) -> Optional[str]:
+    """Formato candidato que interpreta más valores de la muestra (empates: orden de `candidates`)."""
+    best_fmt, best_count = None, 0
+    for fmt in candidates:
+        count = _parsed_count(sample, fmt)
+        if count > best_count:
+            best_fmt, best_count = fmt, count
+            if count == len(sample):
+                break
+    return best_fmt
+
+
+def parse_dates(
+    values: pd.Series,
+    format_hint: Optional[str] = None,
+    sample_size: int = DATE_INFERENCE_SAMPLE
+) -> Tuple[pd.Series, Dict[str, Any]]:
+    """
+    Convierte `values` a datetime64 alineado al índice de entrada.
+    - `format_hint` (p.ej. el formato cacheado en el manifiesto) se usa si interpreta toda la muestra;
+      si no, se infiere de nuevo entre DATE_FORMAT_CANDIDATES.
+    - Las filas que fallan con el formato explícito se reintentan con parseo mixto por elemento.
+    Devuelve (fechas, reporte) con el formato usado y los conteos de filas vacías, de reintento y coerced.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        blank = int(values.isna().sum())
+        return values, {"format": format_hint, "rows": len(values), "blank": blank, "fallback": 0, "coerced": 0}
+
+    # Cada texto distinto se parsea una sola vez (los extractos repiten muchas fechas)
+    unique_values = UniqueValues(values)
+    strings = unique_values.uniques.astype(str).str.strip()
+    present = (strings != "").to_numpy()
+    strings = strings[present]
+
+    sample = strings.head(sample_size)
+    if format_hint and len(sample) and _parsed_count(sample, format_hint) == len(sample):
+        fmt = format_hint
+    else:
+        fmt = infer_date_format(sample) if len(sample) else format_hint
+
+    parsed = pd.Series(pd.NaT, index=range(len(unique_values)), dtype="datetime64[ns]")
+    if fmt and len(strings):
+        parsed[present] = pd.to_datetime(strings, format=fmt, errors="coerce").to_numpy()
+    failed = pd.Series(present, index=parsed.index) & parsed.isna()
+    if failed.any():
+        parsed[failed] = pd.to_datetime(strings[failed[present].to_numpy()], format="mixed", errors="coerce").to_numpy()
+
+    # Expansión a filas: los nulos son NaT y no cuentan como presentes
+    dates = pd.Series(unique_values.expand(parsed, pd.NaT, "datetime64[ns]"), index=values.index)
+
+    row_present = unique_values.expand(present, False, bool)
+    row_failed = unique_values.expand(failed, False, bool)
+    report = {
+        "format": fmt,
+        "rows": len(values),
+        "blank": int((~row_present).sum()),
+        "fallback": int(row_failed.sum()),
+        "coerced": int((row_present & dates.isna().to_numpy()).sum())
+    }
+    return dates, report
@@ -0,0 +1,111 @@
+"""
+scripts/utils/excel_cache.py
+Caché columnar de hojas Excel: la primera lectura de (libro, hoja, opciones) se parsea con el motor
+Excel y se conserva como DataFrame serializado; las siguientes se sirven desde disco sin abrir el libro.
+Las entradas se identifican por el hash de contenido del libro, así que editarlo las invalida.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import List, Optional, Union
+
+import pandas as pd
+
+from scripts.config import EXCEL_CACHE_DIR, EXCEL_ENGINE
+from scripts.utils.fingerprint import file_sha256, payload_fingerprint
+
+try:
+    import python_calamine
+except ImportError:
+    python_calamine = None
+
+SheetName = Union[str, int]
+
+
+def resolve_excel_engine(engine: Optional[str] = EXCEL_ENGINE) -> Optional[str]:
+    """Motor efectivo: 'calamine' solo si python-calamine está instalado; None = motor por defecto de pandas."""
+    if engine == "calamine" and python_calamine is None:
+        return None
+    return engine
+
+
+class CachedExcelFile:
+    """
+    Sustituto de pd.ExcelFile con caché por hoja.
+    El libro solo se abre (motor Excel) ante el primer fallo de caché; `cache_dir=None` desactiva la caché.
+    """
+
+    def __init__(self, path: Path, engine: Optional[str] = EXCEL_ENGINE, cache_dir: Optional[Path] = EXCEL_CACHE_DIR):
+        self.path = Path(path)
+        self.engine = resolve_excel_engine(engine)
+        self.cache_dir = cache_dir
+        self._excel: Optional[pd.ExcelFile] = None
+        self._content_hash: Optional[str] = None
+        # Prefijo estable por ruta: permite purgar entradas de versiones anteriores del mismo libro
+        self._path_key = hashlib.sha256(str(self.path.resolve()).encode("utf-8")).hexdigest()[:16]
+
+    def __enter__(self) -> "CachedExcelFile":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._excel is not None:
+            self._excel.close()
+            self._excel = None
+
+    def _workbook(self) -> pd.ExcelFile:
+        if self._excel is None:
+            self._excel = pd.ExcelFile(self.path, engine=self.engine)
+        return self._excel
+
+    def _entry_path(self, *key: object) -> Path:
+        if self._content_hash is None:
+            self._content_hash = file_sha256(self.path)
+        entry_key = payload_fingerprint([self.engine, *key])[:16]
+        return self.cache_dir / f"{self._path_key}_{self._content_hash[:16]}_{entry_key}.pkl"
+
+    def _store(self, entry_path: Path, value: object) -> None:
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        # Temporal por proceso: varios workers pueden poblar la caché a la vez
+        tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        pd.to_pickle(value, tmp_path)
+        os.replace(tmp_path, entry_path)
+
+        # Purga entradas del mismo libro con contenido anterior
+        current_prefix = f"{self._path_key}_{self._content_hash[:16]}_"
+        for stale in entry_path.parent.glob(f"{self._path_key}_*.pkl"):
+            if not stale.name.startswith(current_prefix):
+                stale.unlink(missing_ok=True)
+
+    def _cached(self, key: tuple, compute):
+        if self.cache_dir is None:
+            return compute()
+        entry_path = self._entry_path(*key)
+        if entry_path.exists():
+            try:
+                return pd.read_pickle(entry_path)
+            except Exception:
+                pass
+        value = compute()
+        self._store(entry_path, value)
+        return value
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return self._cached(("__sheet_names__",), lambda: list(self._workbook().sheet_names))
+
+    def parse(self, sheet_name: SheetName = 0, header: Optional[int] = 0, nrows: Optional[int] = None) -> pd.DataFrame:
+        """Equivalente a pd.read_excel(libro, sheet_name, header, nrows) servido desde caché si existe."""
+        return self._cached(
+            ("sheet", sheet_name, header, nrows),
+            lambda: self._workbook().parse(sheet_name=sheet_name, header=header, nrows=nrows)
+        )
+
+
+def read_excel_cached(path: Path, sheet_name: SheetName = 0, header: Optional[int] = 0) -> pd.DataFrame:
+    """Lectura puntual de una hoja con caché columnar."""
+    with CachedExcelFile(path) as excel:
+        return excel.parse(sheet_name=sheet_name, header=header)
@@ -0,0 +1,55 @@
+"""
+scripts/utils/fingerprint.py
+Huellas de archivos fuente (mtime/tamaño + hash de contenido) para invalidar cachés en disco.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+_HASH_CHUNK_BYTES = 1 << 20
+
+
+def file_sha256(path: Path) -> str:
+    """Hash SHA-256 del contenido completo del archivo, leído por bloques."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(_HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def payload_fingerprint(payload: object) -> str:
+    """Hash SHA-256 estable de una estructura serializable (reglas, versiones de formato)."""
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def file_signature(path: Path) -> Optional[Dict[str, int]]:
+    """Firma barata (mtime_ns, size) del archivo; None si no existe."""
+    if not path.exists():
+        return None
+    stat = path.stat()
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def describe_source(path: Path) -> Optional[Dict[str, object]]:
+    """Firma + hash de contenido de un archivo fuente; None si no existe."""
+    signature = file_signature(path)
+    if signature is None:
+        return None
+    return {**signature, "sha256": file_sha256(path)}
+
+
+def source_unchanged(path: Path, recorded: Optional[Dict[str, object]]) -> bool:
+    """
+    Compara un archivo contra su descripción registrada.
+    Atajo por mtime/tamaño; si difieren, decide el hash de contenido (un 'touch' no invalida).
+    """
+    signature = file_signature(path)
+    if signature is None or recorded is None:
+        return signature is None and recorded is None
+    if signature["mtime_ns"] == recorded.get("mtime_ns") and signature["size"] == recorded.get("size"):
+        return True
+    return signature["size"] == recorded.get("size") and file_sha256(path) == recorded.get("sha256")
@@ -0,0 +1,113 @@
+"""
+scripts/utils/gl_tree.py
+Jerarquía del plan de cuentas (GL): construcción lineal de parent_code a partir de la sangría
+y un índice en memoria código -> nodo / hijos / ancestros para búsquedas O(1).
+"""
+
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import pandas as pd
+
+
+def split_gl_label(text: object) -> Tuple[str, str]:
+    """'6435: General Repairs' -> ('6435', 'General Repairs'); sin ':' el texto completo es el nombre."""
+    text = "" if text is None or pd.isna(text) else str(text)
+    if ":" in text:
+        code, name = text.split(":", 1)
+        return code.strip(), name.strip()
+    return "", text.strip()
+
+
+def _indent(text: str) -> int:
+    return len(text) - len(text.lstrip())
+
+
+def build_parent_codes(accounts: Sequence[str]) -> List[str]:
+    """
+    parent_code de cada cuenta = código de la cuenta anterior más cercana con menor sangría ("" si no hay).
+    Pila monótona en una sola pasada: O(n) frente al escaneo hacia atrás por fila (O(n²)).
+    """
+    parents: List[str] = []
+    stack: List[Tuple[int, str]] = []  # (sangría, código) con sangrías estrictamente crecientes
+    for account in accounts:
+        indent = _indent(account)
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        parents.append(stack[-1][1] if stack else "")
+        stack.append((indent, account.split(":")[0].strip()))
+    return parents
+
+
+class GLNode(NamedTuple):
+    code: str
+    name: str
+    parent: str
+    gl_type: str
+
+    @property
+    def label(self) -> str:
+        """Etiqueta AppFolio 'código: nombre'."""
+        return f"{self.code}: {self.name}"
+
+
+class GLTree:
+    """Índice del plan de cuentas: nodo por código, hijos por padre y ancestros (raíz al final)."""
+
+    def __init__(self, nodes: Iterable[GLNode] = ()):
+        self.nodes: Dict[str, GLNode] = {}
+        self.children: Dict[str, List[str]] = {}
+        for node in nodes:
+            if not node.code or node.code in self.nodes:
+                continue
+            self.nodes[node.code] = node
+            self.children.setdefault(node.parent, []).append(node.code)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "GLTree":
+        """Construye el índice desde normalized_gl_accounts.csv (gl_code, raw_name, parent_code, gl_type)."""
+        def column(name: str) -> List[str]:
+            if name not in df.columns:
+                return [""] * len(df)
+            return ["" if pd.isna(v) else str(v).strip() for v in df[name]]
+
+        return cls(
+            GLNode(code, name, parent, gl_type)
+            for code, name, parent, gl_type in zip(
+                column("gl_code"), column("raw_name"), column("parent_code"), column("gl_type")
+            )
+        )
+
+    @classmethod
+    def from_csv(cls, path: Path) -> "GLTree":
+        # Códigos como texto: "0100" no debe convertirse en 100
+        return cls.from_frame(pd.read_csv(path, dtype=str))
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, code: object) -> bool:
+        return code in self.nodes
+
+    def get(self, code: str) -> Optional[GLNode]:
+        return self.nodes.get(code)
+
+    def children_of(self, code: str) -> List[str]:
+        return list(self.children.get(code, []))
+
+    def ancestors(self, code: str) -> List[str]:
+        """Códigos de los ancestros desde el padre inmediato hasta la raíz (tolerante a ciclos)."""
+        chain: List[str] = []
+        seen = {code}
+        node = self.nodes.get(code)
+        while node is not None and node.parent and node.parent not in seen:
+            chain.append(node.parent)
+            seen.add(node.parent)
+            node = self.nodes.get(node.parent)
+        return chain
+
+    def canonical_label(self, gl_text: object) -> Optional[str]:
+        """Etiqueta 'código: nombre' del plan si el código de `gl_text` existe; None si no es válido."""
+        code, name = split_gl_label(gl_text)
+        node = self.nodes.get(code or name)
+        return node.label if node is not None else None
@@ -0,0 +1,61 @@
+"""
+scripts/utils/lru_cache.py
+Caché LRU acotada con contadores de aciertos, fallos y desalojos para memoizar resoluciones.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+# Centinela de fallo: permite memoizar también resultados None (p.ej. "sin match")
+CACHE_MISS = object()
+
+
+class BoundedLRUCache:
+    """Diccionario LRU de tamaño máximo fijo que expone estadísticas de uso."""
+
+    def __init__(self, maxsize: int = 50_000):
+        if maxsize <= 0:
+            raise ValueError(f"maxsize debe ser positivo, recibido: {maxsize}")
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Any:
+        """Devuelve el valor memoizado o CACHE_MISS, actualizando la recencia."""
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return CACHE_MISS
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Descarta todas las entradas (p.ej. al recompilar reglas); los contadores se conservan."""
+        if self._data:
+            self._data.clear()
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": len(self._data),
+            "maxsize": self.maxsize
+        }
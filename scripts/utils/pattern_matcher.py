@@ -0,0 +1,117 @@
+"""
+scripts/utils/pattern_matcher.py
+Autómata Aho-Corasick para búsqueda simultánea de múltiples claves literales.
+Sustituye la evaluación secuencial de N patrones `re.escape(...)` por un único recorrido del texto.
+"""
+
+from collections import deque
+from typing import Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_NO_MATCH = -1
+
+
+class MultiPatternMatcher(Generic[T]):
+    """
+    Índice multi-patrón sobre subcadenas literales.
+
+    Cada patrón recibe un rango igual a su posición de inserción; cuando varias claves
+    aparecen en el texto gana la de menor rango, replicando la semántica de
+    "primer patrón de la lista que hace match" del recorrido secuencial.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, T]] = ()):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Rangos terminales propios de cada nodo y mejor rango alcanzable vía enlaces de fallo
+        self._own: List[List[int]] = [[]]
+        self._best: List[int] = [_NO_MATCH]
+        self.keys: List[str] = []
+        self.payloads: List[T] = []
+
+        for key, payload in patterns:
+            self._insert(key, payload)
+        self._build_failure_links()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _insert(self, key: str, payload: T) -> None:
+        rank = len(self.keys)
+        self.keys.append(key)
+        self.payloads.append(payload)
+        if not key:
+            return
+
+        node = 0
+        for ch in key:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._own.append([])
+                self._best.append(_NO_MATCH)
+            node = nxt
+        self._own[node].append(rank)
+
+    def _build_failure_links(self) -> None:
+        """Recorrido BFS estándar: enlaces de fallo y propagación del mejor rango."""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            self._best[child] = min(self._own[child], default=_NO_MATCH)
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+
+                candidates = list(self._own[child])
+                inherited = self._best[self._fail[child]]
+                if inherited != _NO_MATCH:
+                    candidates.append(inherited)
+                self._best[child] = min(candidates, default=_NO_MATCH)
+                queue.append(child)
+
+    def _step(self, node: int, ch: str) -> int:
+        while node and ch not in self._goto[node]:
+            node = self._fail[node]
+        return self._goto[node].get(ch, 0)
+
+    def first_rank(self, text: str) -> int:
+        """Rango mínimo entre todas las claves contenidas en `text` (-1 si ninguna)."""
+        best = _NO_MATCH
+        node = 0
+        for ch in text:
+            node = self._step(node, ch)
+            rank = self._best[node]
+            if rank != _NO_MATCH and (best == _NO_MATCH or rank < best):
+                best = rank
+                if best == 0:
+                    break
+        return best
+
+    def first_match(self, text: str) -> Optional[T]:
+        """Payload de la clave de mayor prioridad presente en `text`, o None."""
+        rank = self.first_rank(text)
+        return None if rank == _NO_MATCH else self.payloads[rank]
+
+    def find_all(self, text: str) -> List[int]:
+        """Rangos (ordenados) de todas las claves presentes en `text` en un único recorrido."""
+        found = set()
+        node = 0
+        for ch in text:
+            node = self._step(node, ch)
+            probe = node
+            while probe:
+                found.update(self._own[probe])
+                probe = self._fail[probe]
+        return sorted(found)
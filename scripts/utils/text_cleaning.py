@@ -1,10 +1,17 @@
 # scripts/utils/text_cleaning.py
 
+from functools import lru_cache
 from unidecode import unidecode
 import re
 import pandas as pd
 
+from scripts.config import VENDOR_NORMALIZE_CACHE_SIZE
+from scripts.utils.unique_values import map_unique
+
 # --- Normalización de GL Accounts ---
+_GL_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
 def normalize_gl_account(text):
     """
     Limpia y normaliza textos de cuentas contables (GL Accounts).
@@ -14,35 +21,44 @@ def normalize_gl_account(text):
         return ""
     text = unidecode(str(text))  # elimina acentos
     text = text.lower().strip()
-    text = re.sub(r"[^\w\s]", "", text)  # quita puntuación
-    text = re.sub(r"\s+", " ", text)     # normaliza espacios
+    text = _GL_PUNCTUATION.sub("", text)  # quita puntuación
+    text = _WHITESPACE.sub(" ", text)     # normaliza espacios
     return text
 
 
 # --- Normalización de Vendors ---
 KEEP_THE = {"the home depot", "The Right Fix"}
 
-def normalize_vendor(text):
-    if not isinstance(text, str) or text.strip() == "":
-        return ""
+# Patrones precompilados (antes se recompilaban desde texto en cada llamada)
+_LONG_NUMBERS = re.compile(r"\d{3,}")
+_SPECIAL_CHARS = re.compile(r"[^\w\s]")
+_LOCATION_CITIES = re.compile(r"\b(miami|cleveland|fort lauderd[a-z]*|davie|hialeah|opa locka|north miami)\b")
+_LOCATION_STATES = re.compile(r"\b(fl|oh|ca|wa|tx|ny|pa|il|ga|nc|az|ma|mi)\b$")
 
+# Tabla de traducción: todo carácter ASCII que no es palabra ni espacio (incluidos "-" y "*") pasa a espacio.
+# unidecode devuelve ASCII, así que un único str.translate sustituye al re.sub de caracteres especiales.
+_SPECIAL_TO_SPACE = str.maketrans({chr(c): " " for c in range(128) if _SPECIAL_CHARS.match(chr(c))})
+
+
+@lru_cache(maxsize=VENDOR_NORMALIZE_CACHE_SIZE)
+def _normalize_vendor_text(text: str) -> str:
     text = unidecode(text)  # elimina acentos
     text = text.lower().strip()
 
-    # Reemplazar guiones y * por espacio
-    text = text.replace("-", " ").replace("*", " ")
+    # Reemplazar guiones, * y demás caracteres especiales por espacio.
+    # Es equivalente a hacerlo tras eliminar los números largos: ambos sustituyen por espacio clases disjuntas.
+    text = text.translate(_SPECIAL_TO_SPACE)
+    if not text.isascii():
+        text = _SPECIAL_CHARS.sub(" ", text)
 
     # Eliminar números largos (referencias de tarjeta, etc.)
-    text = re.sub(r"\d{3,}", " ", text)
-
-    # Quitar caracteres especiales restantes
-    text = re.sub(r"[^\w\s]", " ", text)
+    text = _LONG_NUMBERS.sub(" ", text)
 
     # Normalizar abreviaturas comunes
     text = text.replace("hdwe", "hardware")
 
     # Colapsar espacios
-    text = re.sub(r"\s+", " ", text).strip()
+    text = " ".join(text.split())
 
     # Manejo de "the"
     if text.startswith("the ") and text not in KEEP_THE:
@@ -57,11 +73,28 @@ def normalize_vendor(text):
         return "the home depot"
 
     # Eliminar sufijos de ubicación (ciudad + estado)
-    text = re.sub(r"\b(miami|cleveland|fort lauderd[a-z]*|davie|hialeah|opa locka|north miami)\b", "", text)
-    text = re.sub(r"\b(fl|oh|ca|wa|tx|ny|pa|il|ga|nc|az|ma|mi)\b$", "", text).strip()
+    text = _LOCATION_CITIES.sub("", text)
+    text = _LOCATION_STATES.sub("", text).strip()
 
     # Colapsar otra vez espacios
-    text = re.sub(r"\s+", " ", text).strip()
+    return " ".join(text.split())
+
+
+def normalize_vendor(text):
+    if not isinstance(text, str) or text.strip() == "":
+        return ""
+    return _normalize_vendor_text(text)
+
+
+def normalize_vendor_series(values: pd.Series) -> pd.Series:
+    """Variante por lotes de normalize_vendor (nulos y no-texto -> ""), intercambiable con Series.apply."""
+    return map_unique(values, normalize_vendor, "", dtype=None)
+
+
+def vendor_cache_info():
+    """Estadísticas de la caché LRU de normalize_vendor (hits, misses, maxsize, currsize)."""
+    return _normalize_vendor_text.cache_info()
 
-    return text
 
+def clear_vendor_cache() -> None:
+    _normalize_vendor_text.cache_clear()
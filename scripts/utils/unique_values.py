@@ -0,0 +1,45 @@
+"""
+scripts/utils/unique_values.py
+Cálculo por valor distinto con reexpansión a filas: las columnas de extractos y ledger repiten
+muchísimo cada valor, así que cualquier transformación fila a fila se evalúa una vez por valor único.
+Es el único sitio que define cómo se tratan los nulos (código -1 de pd.factorize) y el dtype resultante.
+"""
+
+from typing import Any, Callable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class UniqueValues:
+    """Valores distintos de una Series (`uniques`, dtype object) y el código de cada fila (-1 = nulo)."""
+
+    def __init__(self, values: pd.Series):
+        self.index = values.index
+        self.codes, uniques = pd.factorize(values)
+        self.uniques = pd.Series(uniques, dtype=object)
+
+    def __len__(self) -> int:
+        return len(self.uniques)
+
+    def expand(self, table: Sequence[Any], null_value: Any, dtype: Any = object) -> np.ndarray:
+        """Reexpande `table` (un resultado por valor distinto) a las filas; los nulos toman `null_value`."""
+        lookup = pd.Series(list(table) + [null_value], dtype=dtype).to_numpy()
+        return lookup[self.codes]
+
+
+def map_unique(
+    values: pd.Series,
+    fn: Callable[[Any], Any],
+    null_value: Any,
+    dtype: Optional[Any] = object
+) -> pd.Series:
+    """
+    Equivalente a values.map(fn) alineado al índice, evaluando `fn` una sola vez por valor distinto.
+    Los nulos no llaman a `fn` y toman `null_value`. dtype=None infiere el dtype igual que Series.apply.
+    """
+    unique_values = UniqueValues(values)
+    expanded = unique_values.expand([fn(value) for value in unique_values.uniques], null_value)
+    if dtype is None:
+        return pd.Series(list(expanded), index=values.index)
+    return pd.Series(expanded, index=values.index, dtype=dtype)